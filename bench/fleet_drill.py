@@ -0,0 +1,236 @@
+"""
+Fleet Mode drill.
+
+Starts a real core plus N fleet agents with the simulated executor as separate
+processes on this machine, drives the core through the HUD WebSocket and checks:
+per-host results of a fan-out, that approval-gated runs wait for 'yes', that
+unsafe parameters and bad tokens are refused, and that every agent registers
+again after the core restarts.
+
+    python bench/fleet_drill.py --agents 5
+    python bench/fleet_drill.py --agents 20 --latency 1.0 --keep-logs
+
+Exits with 0 when every check passes.
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import websockets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Drill:
+    def __init__(self, agents: int, latency: float, log_dir: str):
+        self.agent_count = agents
+        self.latency = latency
+        self.log_dir = log_dir
+        self.hud_port = free_port()
+        self.fleet_port = free_port()
+        self.env = dict(os.environ, JARVIS_FLEET_TOKEN=secrets.token_hex(16), PYTHONUNBUFFERED="1")
+        # Reflex Mode only: the drill must not depend on (or bill) the LLM
+        self.env.pop("GEMINI_API_KEY", None)
+        self.core: Optional[subprocess.Popen] = None
+        self.agents: List[subprocess.Popen] = []
+        self.results: List[Dict[str, Any]] = []
+
+    @property
+    def hosts(self) -> Set[str]:
+        return {f"drill-{i}" for i in range(self.agent_count)}
+
+    # --- Processes ---
+
+    def _spawn(self, name: str, args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        log = open(os.path.join(self.log_dir, f"{name}.log"), "ab")
+        return subprocess.Popen([sys.executable, MAIN] + args, cwd=ROOT, env=env or self.env,
+                                stdout=log, stderr=subprocess.STDOUT)
+
+    def start_core(self):
+        self.core = self._spawn("core", ["--port", str(self.hud_port), "--fleet-port", str(self.fleet_port)])
+
+    def stop_core(self):
+        if self.core:
+            self.core.terminate()
+            self.core.wait(timeout=15)
+            self.core = None
+
+    def start_agent(self, host: str, env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+        url = f"ws://127.0.0.1:{self.fleet_port}/fleet/ws"
+        return self._spawn(host, ["--fleet-agent", url, "--host", host, "--simulate",
+                                  "--latency", str(self.latency)], env)
+
+    def stop_all(self):
+        for proc in self.agents + ([self.core] if self.core else []):
+            if proc.poll() is None:
+                proc.terminate()
+        for proc in self.agents + ([self.core] if self.core else []):
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    # --- Core API ---
+
+    def fleet_status(self) -> Dict[str, Any]:
+        with urllib.request.urlopen(f"http://127.0.0.1:{self.hud_port}/fleet", timeout=2) as resp:
+            return json.loads(resp.read())
+
+    async def wait_for_hosts(self, expected: Set[str], timeout: float) -> float:
+        """Returns the seconds it took until exactly the expected hosts were registered."""
+        started = time.monotonic()
+        while time.monotonic() - started < timeout:
+            try:
+                online = {h["host"] for h in self.fleet_status()["hosts"]}
+                if online == expected:
+                    return time.monotonic() - started
+            except OSError:
+                pass  # Core not up yet
+            await asyncio.sleep(0.2)
+        raise TimeoutError(f"expected hosts {sorted(expected)} after {timeout:.0f}s")
+
+    # --- HUD helpers ---
+
+    @staticmethod
+    async def recv_logs(ws, until: Callable[[Dict[str, Any]], bool], timeout: float) -> List[Dict[str, Any]]:
+        """Collects log frames (ignoring pushed stats) up to and including the one matching `until`."""
+        frames = []
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"no matching frame after {timeout:.0f}s, got {[f['msg'][:60] for f in frames]}")
+            frame = json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining))
+            if frame.get("type") != "log":
+                continue
+            frames.append(frame)
+            if until(frame):
+                return frames
+
+    async def fleet_run(self, ws, cmd: Dict[str, Any], approve: bool = False) -> Dict[str, str]:
+        """Sends a fleet command and returns {host: status icon} once the run completes."""
+        await ws.send(json.dumps({"type": "fleet", **cmd}))
+        if approve:
+            frames = await self.recv_logs(ws, lambda f: "APPROVAL REQUIRED" in f["msg"], 10)
+            assert not any(f["user"].startswith("Fleet:") for f in frames), "hosts ran before approval"
+            # Nothing may reach the hosts while the approval is pending
+            quiet = await self._drain(ws, self.latency * 2 + 0.5)
+            assert not any(f.get("user", "").startswith("Fleet:") for f in quiet), "hosts ran before approval"
+            await ws.send(json.dumps({"type": "chat", "msg": "yes"}))
+
+        timeout = self.latency * 3 + 30
+        frames = await self.recv_logs(ws, lambda f: "complete:" in f["msg"], timeout)
+        return {f["user"].split(":", 1)[1]: f["msg"][:1] for f in frames if f["user"].startswith("Fleet:")}
+
+    @staticmethod
+    async def _drain(ws, seconds: float) -> List[Dict[str, Any]]:
+        frames = []
+        deadline = time.monotonic() + seconds
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                frames.append(json.loads(await asyncio.wait_for(ws.recv(), timeout=remaining)))
+            except asyncio.TimeoutError:
+                break
+        return frames
+
+    # --- Checks ---
+
+    async def check(self, name: str, coro):
+        started = time.monotonic()
+        try:
+            detail = await coro
+            ok = True
+        except Exception as e:
+            detail = f"{type(e).__name__}: {e}"
+            ok = False
+        self.results.append({"check": name, "ok": ok, "seconds": round(time.monotonic() - started, 2),
+                             "detail": detail})
+        print(f"{'PASS' if ok else 'FAIL'}  {name:<34} {detail}")
+
+    async def all_hosts_answer(self, cmd: Dict[str, Any], approve: bool = False) -> str:
+        async with websockets.connect(f"ws://127.0.0.1:{self.hud_port}/ws") as ws:
+            per_host = await self.fleet_run(ws, cmd, approve)
+        assert set(per_host) == self.hosts, f"answered: {sorted(per_host)}"
+        assert set(per_host.values()) == {"✅"}, f"results: {per_host}"
+        return f"{len(per_host)} hosts ok"
+
+    async def unsafe_param_refused(self) -> str:
+        async with websockets.connect(f"ws://127.0.0.1:{self.hud_port}/ws") as ws:
+            await ws.send(json.dumps({"type": "fleet", "action": "fix_system_issue",
+                                      "param": {"target": "gpg", "key_id": "0; id"}}))
+            frames = await self.recv_logs(ws, lambda f: f["user"] == "System", 10)
+        assert frames[-1]["msg"].startswith("⛔"), frames[-1]["msg"]
+        return frames[-1]["msg"][:60]
+
+    async def bad_token_refused(self) -> str:
+        intruder = self.start_agent("intruder", dict(self.env, JARVIS_FLEET_TOKEN="wrong-token"))
+        try:
+            await asyncio.sleep(3)
+            online = {h["host"] for h in self.fleet_status()["hosts"]}
+            assert "intruder" not in online, "intruder registered"
+        finally:
+            intruder.terminate()
+            intruder.wait(timeout=10)
+        return "rejected"
+
+    async def reconnect_after_restart(self) -> str:
+        self.stop_core()
+        self.start_core()
+        # Agents back off exponentially (1s, 2s, 4s, ... plus jitter)
+        elapsed = await self.wait_for_hosts(self.hosts, timeout=60)
+        return f"all {self.agent_count} re-registered in {elapsed:.1f}s"
+
+    async def run(self) -> bool:
+        self.start_core()
+        self.agents = [self.start_agent(host) for host in sorted(self.hosts)]
+        try:
+            elapsed = await self.wait_for_hosts(self.hosts, timeout=60)
+            print(f"core + {self.agent_count} agents up in {elapsed:.1f}s (logs: {self.log_dir})")
+
+            await self.check("read-only fan-out", self.all_hosts_answer({"action": "security_scan_ports"}))
+            await self.check("approval-gated fan-out", self.all_hosts_answer({"action": "update_system"}, approve=True))
+            await self.check("unsafe parameters refused", self.unsafe_param_refused())
+            await self.check("bad token refused", self.bad_token_refused())
+            await self.check("reconnect after core restart", self.reconnect_after_restart())
+            await self.check("fan-out after restart", self.all_hosts_answer({"action": "security_scan_ports"}))
+        finally:
+            self.stop_all()
+        return all(result["ok"] for result in self.results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--agents", type=int, default=3, help="Number of simulated fleet agents")
+    parser.add_argument("--latency", type=float, default=0.3, help="Latency of simulated actions in seconds")
+    parser.add_argument("--keep-logs", action="store_true", help="Keep process logs even if all checks pass")
+    args = parser.parse_args()
+
+    log_dir = tempfile.mkdtemp(prefix="jarvis-fleet-drill-")
+    ok = asyncio.run(Drill(args.agents, args.latency, log_dir).run())
+    if ok and not args.keep_logs:
+        for name in os.listdir(log_dir):
+            os.remove(os.path.join(log_dir, name))
+        os.rmdir(log_dir)
+    else:
+        print(f"Process logs: {log_dir}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
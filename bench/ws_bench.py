@@ -0,0 +1,416 @@
+"""
+Load & latency benchmark for the /ws core.
+
+Starts the FastAPI app in-process (uvicorn on a background thread with its own
+event loop), swaps Gemini and the OS executor for local stand-ins with
+configurable latency, opens N simulated HUD clients and replays a recorded
+command mix. Results are written as JSON so runs can be compared.
+
+    python bench/ws_bench.py --clients 20 --duration 30 --llm-latency 0.3
+    python bench/ws_bench.py --mix bench/mixes/approval_heavy.json --out after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize_ms(values: List[float]) -> Dict[str, Any]:
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+    return {
+        "count": len(values),
+        "p50_ms": ms(percentile(values, 50)),
+        "p90_ms": ms(percentile(values, 90)),
+        "p99_ms": ms(percentile(values, 99)),
+        "max_ms": ms(max(values) if values else None),
+    }
+
+
+# --- Stand-ins ---
+
+class FakeModel:
+    """
+    Replaces the Gemini model: sleeps like a network call (blocking, as the real
+    SDK does) and answers with the Reflex Mode intent for the same query.
+    """
+
+    def __init__(self, latency: float, jitter: float, seed: int):
+        from core.agent import HybridAgent
+        self.latency = latency
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._reflex = HybridAgent()
+        # Untimed original, so the stand-in does not show up in the agent metrics twice
+        self._parse = getattr(HybridAgent.process_input, "__wrapped__", HybridAgent.process_input)
+
+    def generate_content(self, prompt: str, generation_config=None):
+        with self._lock:
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter))
+        time.sleep(delay)
+        query = prompt.rsplit("User: ", 1)[-1]
+        return SimpleNamespace(text=json.dumps(self._parse(self._reflex, "", query)))
+
+
+def install_stand_ins(main_module, args):
+    """Points main.py at the fake LLM and the simulated executor."""
+    import core.agent as agent_module
+    from core.agent import HybridAgent
+    from core.executor import SimulatedExecutor
+
+    if agent_module.genai is None:
+        # Only checked for truthiness before the model is called
+        agent_module.genai = SimpleNamespace()
+    model = FakeModel(args.llm_latency, args.llm_jitter, args.seed)
+
+    def make_agent():
+        agent = HybridAgent()
+        agent.api_key = "bench"
+        agent.model = model
+        return agent
+
+    class BenchExecutorFactory:
+        @staticmethod
+        def get_executor(os_type: str):
+            return SimulatedExecutor(latency=args.exec_latency)
+
+    main_module.HybridAgent = make_agent
+    main_module.ExecutorFactory = BenchExecutorFactory
+
+
+# --- Server ---
+
+class ServerThread:
+    """uvicorn on a dedicated thread + event loop, so client load does not skew server loop lag."""
+
+    def __init__(self, app):
+        import uvicorn
+        config = uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="on")
+        self.server = uvicorn.Server(config)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name="bench-server", daemon=True)
+        self.port = None
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self.server.serve())
+
+    def start(self, timeout: float = 30.0) -> float:
+        started = time.perf_counter()
+        self.thread.start()
+        while not self.server.started:
+            if time.perf_counter() - started > timeout or not self.thread.is_alive():
+                raise RuntimeError("Server did not start.")
+            time.sleep(0.005)
+        self.port = self.server.servers[0].sockets[0].getsockname()[1]
+        return time.perf_counter() - started
+
+    def run(self, coro):
+        """Runs a coroutine on the server loop (from the client thread)."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=10)
+
+
+async def probe_loop_lag(samples: List[float], interval: float = 0.05):
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(max(time.perf_counter() - start - interval, 0.0))
+
+
+# --- Clients ---
+
+class HudClient:
+    def __init__(self, client_id: int, url: str, mix: Dict[str, Any], rng: random.Random):
+        self.client_id = client_id
+        self.url = url
+        self.mix = mix
+        self.rng = rng
+        self.latencies: Dict[str, List[float]] = {}
+        self.busy = 0
+        self.timeouts = 0
+        # Replies that arrived without a request waiting for them (late or unsolicited)
+        self.stale = 0
+        self.stats_arrivals: List[float] = []
+        self._replies: asyncio.Queue = asyncio.Queue()
+
+    async def connect(self):
+        import websockets
+        self.ws = await websockets.connect(self.url, max_size=None)
+        self.reader = asyncio.create_task(self._read())
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                frame = json.loads(raw)
+                if frame.get("type") == "stats":
+                    self.stats_arrivals.append(time.perf_counter())
+                elif frame.get("type") == "log":
+                    self._replies.put_nowait((time.perf_counter(), frame))
+        except Exception:
+            pass
+
+    async def replay(self, deadline: float, reply_timeout: float):
+        steps = self.mix["steps"]
+        low, high = self.mix.get("think_time", [0.2, 1.0])
+        # Stagger clients so they do not fire in lockstep (approvals must follow their request)
+        position = 0
+        await asyncio.sleep(self.rng.uniform(0, high))
+        while time.perf_counter() < deadline:
+            step = steps[position % len(steps)]
+            position += 1
+            # Replies are untagged: anything already queued cannot belong to this request
+            self._discard_stale()
+            sent = time.perf_counter()
+            await self.ws.send(json.dumps(step["cmd"]))
+            try:
+                received, frame = await asyncio.wait_for(self._replies.get(), timeout=reply_timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                # Wait out the late reply so it is not measured as the next step's, then
+                # restart the mix so approval steps follow their request again
+                if not await self._resync(deadline):
+                    break
+                position = 0
+                continue
+            if str(frame.get("msg", "")).startswith("🚦"):
+                self.busy += 1
+            self.latencies.setdefault(step.get("kind", "chat"), []).append(received - sent)
+            await asyncio.sleep(self.rng.uniform(low, high))
+
+    async def _resync(self, deadline: float) -> bool:
+        """Discards the reply that came too late. False if it did not arrive before the run ended."""
+        try:
+            await asyncio.wait_for(self._replies.get(), timeout=max(deadline - time.perf_counter(), 0))
+        except asyncio.TimeoutError:
+            return False
+        self.stale += 1
+        self._discard_stale()
+        return True
+
+    def _discard_stale(self):
+        while not self._replies.empty():
+            self._replies.get_nowait()
+            self.stale += 1
+
+    async def close(self):
+        await self.ws.close()
+        self.reader.cancel()
+
+
+# --- Cold start ---
+
+COLD_START_CODE = """
+import json, time
+t0 = time.perf_counter()
+try:
+    import google.generativeai
+    available = True
+except ImportError:
+    available = False
+t1 = time.perf_counter()
+import main
+t2 = time.perf_counter()
+print(json.dumps({"genai_import_s": t1 - t0, "genai_available": available, "app_import_s": t2 - t0}))
+"""
+
+
+def measure_cold_start(runs: int) -> Dict[str, Any]:
+    """Fresh interpreters: process start + imports (including google.generativeai)."""
+    results = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-c", COLD_START_CODE], cwd=ROOT,
+                              capture_output=True, text=True, env={**os.environ, "JARVIS_METRICS": "1"})
+        total = time.perf_counter() - started
+        if proc.returncode != 0:
+            return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed"}
+        line = [l for l in proc.stdout.splitlines() if l.startswith("{")][-1]
+        results.append({**json.loads(line), "process_s": total})
+    return {
+        "runs": runs,
+        "genai_available": results[0]["genai_available"],
+        "genai_import_s": round(statistics.median(r["genai_import_s"] for r in results), 4),
+        "app_import_s": round(statistics.median(r["app_import_s"] for r in results), 4),
+        "process_s": round(statistics.median(r["process_s"] for r in results), 4),
+    }
+
+
+# --- Runner ---
+
+async def drive_clients(server: ServerThread, mix: Dict[str, Any], args) -> Dict[str, Any]:
+    url = f"ws://127.0.0.1:{server.port}/ws"
+    proc = psutil.Process()
+    rss_before = proc.memory_info().rss
+
+    clients = [HudClient(i, url, mix, random.Random(args.seed + i)) for i in range(args.clients)]
+    for client in clients:
+        await client.connect()
+    # Let every connection settle (subscriptions, first stats frame) before measuring memory
+    await asyncio.sleep(1.5)
+    rss_connected = proc.memory_info().rss
+
+    lag_samples: List[float] = []
+    lag_probe = server.run(probe_loop_lag(lag_samples))
+
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(client.replay(deadline, args.reply_timeout) for client in clients))
+
+    lag_probe.cancel()
+    for client in clients:
+        await client.close()
+
+    by_kind: Dict[str, List[float]] = {}
+    for client in clients:
+        for kind, values in client.latencies.items():
+            by_kind.setdefault(kind, []).extend(values)
+    all_latencies = [value for values in by_kind.values() for value in values]
+
+    intervals = []
+    for client in clients:
+        arrivals = client.stats_arrivals
+        intervals.extend(b - a for a, b in zip(arrivals, arrivals[1:]))
+
+    return {
+        "replies": {
+            **summarize_ms(all_latencies),
+            "busy": sum(c.busy for c in clients),
+            "timeouts": sum(c.timeouts for c in clients),
+            "stale": sum(c.stale for c in clients),
+            "throughput_per_s": round(len(all_latencies) / args.duration, 2),
+            "by_kind": {kind: summarize_ms(values) for kind, values in sorted(by_kind.items())},
+        },
+        "stats_frames": {
+            "count": sum(len(c.stats_arrivals) for c in clients),
+            "interval_mean_ms": round(statistics.mean(intervals) * 1000, 3) if intervals else None,
+            "jitter_ms": round(statistics.pstdev(intervals) * 1000, 3) if intervals else None,
+            "max_interval_ms": round(max(intervals) * 1000, 3) if intervals else None,
+        },
+        "event_loop_lag": summarize_ms(lag_samples),
+        "memory": {
+            "rss_before_mb": round(rss_before / 2**20, 2),
+            "rss_connected_mb": round(rss_connected / 2**20, 2),
+            # Same process: includes the client side of each connection, so it is an upper bound
+            "per_connection_kb": round((rss_connected - rss_before) / max(args.clients, 1) / 1024, 2),
+        },
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]):
+    keys = [
+        ("replies", "p50_ms"), ("replies", "p99_ms"), ("replies", "throughput_per_s"),
+        ("stats_frames", "jitter_ms"), ("event_loop_lag", "p99_ms"),
+        ("memory", "per_connection_kb"), ("cold_start", "app_import_s"),
+    ]
+    print(f"\n{'metric':<32}{'baseline':>12}{'current':>12}{'delta':>10}")
+    for section, key in keys:
+        old = baseline.get("results", {}).get(section, {}).get(key)
+        new = result["results"].get(section, {}).get(key)
+        delta = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "-"
+        print(f"{section + '.' + key:<32}{str(old):>12}{str(new):>12}{delta:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JARVIS /ws load & latency benchmark")
+    parser.add_argument("--clients", type=int, default=10, help="Simulated HUD connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of replay per run")
+    parser.add_argument("--mix", default=os.path.join(ROOT, "bench", "mixes", "hud_default.json"))
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Fake Gemini latency (s)")
+    parser.add_argument("--llm-jitter", type=float, default=0.05, help="Std dev of fake Gemini latency (s)")
+    parser.add_argument("--exec-latency", type=float, default=0.5, help="Simulated executor latency (s)")
+    parser.add_argument("--reply-timeout", type=float, default=30.0)
+    parser.add_argument("--cold-runs", type=int, default=3, help="Fresh-interpreter import runs (0 to skip)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default="bench_result.json")
+    parser.add_argument("--baseline", help="Earlier result JSON to compare against")
+    args = parser.parse_args()
+
+    with open(args.mix) as f:
+        mix = json.load(f)
+
+    # Stand-ins must not pick up a real key or the real executor
+    os.environ.pop("GEMINI_API_KEY", None)
+    os.environ.pop("DISCORD_BOT_TOKEN", None)
+    os.chdir(ROOT)
+
+    cold_start = measure_cold_start(args.cold_runs) if args.cold_runs else None
+
+    import main as core_main
+    logging.getLogger().setLevel(logging.ERROR)
+    install_stand_ins(core_main, args)
+
+    server = ServerThread(core_main.app)
+    startup_s = server.start()
+    try:
+        results = asyncio.run(drive_clients(server, mix, args))
+    finally:
+        server.stop()
+
+    results["server_startup_s"] = round(startup_s, 4)
+    if cold_start:
+        results["cold_start"] = cold_start
+
+    report = {
+        "bench": "ws",
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {**vars(args), "mix": os.path.relpath(args.mix, ROOT)},
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    replies = results["replies"]
+    print(f"replies: {replies['count']} (p50 {replies['p50_ms']} ms, p99 {replies['p99_ms']} ms, "
+          f"busy {replies['busy']}, timeouts {replies['timeouts']}, stale {replies['stale']})")
+    print(f"stats jitter: {results['stats_frames']['jitter_ms']} ms, "
+          f"loop lag p99: {results['event_loop_lag']['p99_ms']} ms, "
+          f"memory/conn: {results['memory']['per_connection_kb']} KB")
+    print(f"Results written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
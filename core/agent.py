@@ -9,6 +9,8 @@ except ImportError:
 
 from core.validator import SecurityValidator, ActionStatus
 from core.executor import CommandExecutor
+from core.speculative import SpeculativePreparer
+from core.metrics import timed, AGENT_PROCESS_SECONDS, AGENT_EXECUTE_SECONDS
 
 logger = logging.getLogger("jarvis.core.agent")
 
@@ -22,6 +24,7 @@ class HybridAgent:
     def __init__(self, use_llm=False):
         self.use_llm = use_llm
         self.validator = SecurityValidator()
+        self.speculator = SpeculativePreparer()
         # Mock system prompt
         self.system_prompt = """
         You are JARVIS, an AI System Administrator.
@@ -48,6 +51,7 @@ class HybridAgent:
         else:
             logger.warning("⚠️ Brain Missing: GEMINI_API_KEY not found. Running in Reflex Mode (Regex).")
 
+    @timed(AGENT_PROCESS_SECONDS)
     def process_input(self, context_summary: str, user_query: str) -> Dict[str, Any]:
         """
         Main loop:
@@ -140,6 +144,7 @@ class HybridAgent:
             
         return mock_response
 
+    @timed(AGENT_EXECUTE_SECONDS)
     async def execute_action(self, action_data: Dict[str, Any], executor: CommandExecutor, bypass_validator: bool = False) -> Dict[str, Any]:
         """
         Executes the action decided by the Agent.
@@ -149,6 +154,13 @@ class HybridAgent:
         
         if not action:
             return {"status": "done", "msg": ""}
+
+        # 0. Parameters are checked even for approved actions (they reach shell commands)
+        param_error = self.validator.validate_params(action, action_data.get("param"))
+        if param_error:
+            msg = f"⛔ Security Shield Blocked Action: {param_error}"
+            logger.warning(msg)
+            return {"status": "blocked", "msg": msg}
             
         # 1. Validate Action (unless bypassed)
         if not bypass_validator:
@@ -162,7 +174,11 @@ class HybridAgent:
             if status == ActionStatus.APPROVAL_NEEDED:
                 impact = self.validator.get_impact_description(action)
                 msg = f"⚠️ Approval Required: {impact}"
-                return {"status": "approval_required", "msg": msg, "action": action, "impact": impact}
+                # Speculative Stage: run the safe part while the user decides
+                preparing = self.speculator.start(action_data, executor)
+                if preparing:
+                    msg += "\n⏳ Pre-checking real impact in the background..."
+                return {"status": "approval_required", "msg": msg, "action": action, "impact": impact, "preparing": preparing}
 
         # 2. Execute Allowed Action
         logger.info(f"Executing Action: {action}")
@@ -179,7 +195,15 @@ class HybridAgent:
         elif action == "resolve_threat": # Demo
             result_msg = "RESOLVING_THREAT"
         elif action == "update_system":
-             result_msg = await executor.update_packages()
+             plan = await self.speculator.claim(action)
+             if plan is not None:
+                 result_msg = await executor.install_prepared_update(plan)
+             else:
+                 result_msg = await executor.update_packages()
+        elif action == "quick_clean":
+             # The dry-run only sized the work; deletion walks again from scratch
+             self.speculator.discard()
+             result_msg = await executor.quick_clean()
         elif action == "fix_system_issue":
              target = action_data.get("param", {}).get("target")
              if target == "gpg":
@@ -0,0 +1,263 @@
+import fnmatch
+import logging
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("jarvis.core.cleaner")
+
+
+def format_bytes(num: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if num < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} TB"
+
+
+def format_category(report: Dict[str, Any]) -> str:
+    verb = "reclaimable" if report["dry_run"] else "freed"
+    line = f"{report['category']}: {format_bytes(report['bytes'])} {verb} ({report['files']:,} files)"
+    if report["errors"]:
+        line += f", {report['errors']:,} errors"
+    return line
+
+
+class _Tally:
+    """Per-worker counters, merged into the category report once (keeps lock traffic low)."""
+
+    def __init__(self, max_errors: int):
+        self.max_errors = max_errors
+        self.files = 0
+        self.bytes = 0
+        self.errors: List[str] = []
+        self.error_count = 0
+
+    def error(self, path: str, e: Exception):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append(f"{path}: {e.strerror if isinstance(e, OSError) and e.strerror else e}")
+
+
+class _Job:
+    """Shared, read-only settings of one category run plus its lock-protected report."""
+
+    def __init__(self, name: str, target: Dict[str, Any], dry_run: bool, max_errors: int):
+        self.dry_run = dry_run
+        self.cutoff = time.time() - target.get("min_age", 0)
+        self.protect = tuple(target.get("protect", ()))
+        self.suffixes = tuple(target.get("suffixes", ()))
+        self.max_errors = max_errors
+        self.dev = None
+        self.lock = threading.Lock()
+        self.report = {"category": name, "files": 0, "bytes": 0, "errors": 0, "error_samples": [], "dry_run": dry_run}
+
+    def merge(self, tally: _Tally):
+        with self.lock:
+            self.report["files"] += tally.files
+            self.report["bytes"] += tally.bytes
+            self.report["errors"] += tally.error_count
+            room = self.max_errors - len(self.report["error_samples"])
+            if room > 0:
+                self.report["error_samples"].extend(tally.errors[:room])
+
+
+# Directories are opened relative to their parent's fd and never through a symlink
+_DIR_FLAGS = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+# The walk needs *at() system calls; without them a swapped path could be followed
+SAFE_WALK = (
+    {os.open, os.stat, os.unlink, os.rmdir} <= os.supports_dir_fd
+    and os.scandir in os.supports_fd
+)
+
+# Bounds open fds per walk (one per level) against maliciously deep trees
+MAX_DEPTH = 64
+
+
+class QuickCleaner:
+    """
+    Parallel cleanup engine for temp files, trash and package caches.
+    Walks with os.scandir and processes entries as they stream in, so directories
+    with millions of files never become in-memory path lists.
+    Top-level subdirectories are fanned out across a bounded thread pool.
+
+    Roots like /tmp are writable by other users, who can swap a directory for a
+    symlink while it is being walked. So the walk never uses full paths: every
+    directory is opened with O_NOFOLLOW relative to its parent's fd, and entries
+    are stat-ed and removed relative to the fd of the directory that listed them.
+
+    targets: category -> {"roots": [...], "min_age": seconds, "protect": [globs], "suffixes": [...]}
+    """
+
+    def __init__(self, targets: Dict[str, Dict[str, Any]], max_workers: int = 4, max_errors: int = 50):
+        if targets and not SAFE_WALK:
+            logger.warning("quick_clean disabled: this platform lacks fd-relative file operations.")
+            targets = {}
+        self.targets = targets
+        self.max_workers = max_workers
+        self.max_errors = max_errors
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def scan(self) -> Iterator[Dict[str, Any]]:
+        """Dry-run. Yields a report of reclaimable bytes per category as each one finishes."""
+        return self._process(dry_run=True)
+
+    def clean(self) -> Iterator[Dict[str, Any]]:
+        """Deletes eligible files. Yields a report per category with per-file errors collected."""
+        return self._process(dry_run=False)
+
+    def _process(self, dry_run: bool) -> Iterator[Dict[str, Any]]:
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="jarvis-clean") as pool:
+            for name, target in self.targets.items():
+                if self._cancel.is_set():
+                    return
+                job = _Job(name, target, dry_run, self.max_errors)
+                for root in target.get("roots", []):
+                    self._run_root(pool, job, root)
+                logger.info(f"quick_clean {'scan' if dry_run else 'run'}: {format_category(job.report)}")
+                yield job.report
+
+    @staticmethod
+    def _open_root(root: str) -> Optional[int]:
+        """
+        Opens root one component at a time without following symlinks, so a user
+        who owns part of the path (e.g. ~/.local/share) cannot point it elsewhere.
+        """
+        if not os.path.isabs(root):
+            return None
+        fd = os.open(os.sep, _DIR_FLAGS)
+        try:
+            for part in os.path.normpath(root).split(os.sep):
+                if not part:
+                    continue
+                next_fd = os.open(part, _DIR_FLAGS, dir_fd=fd)
+                os.close(fd)
+                fd = next_fd
+        except OSError:
+            os.close(fd)
+            return None  # Missing, not a directory, or reached through a symlink
+        return fd
+
+    def _run_root(self, pool: ThreadPoolExecutor, job: _Job, root: str):
+        root_fd = self._open_root(root)
+        if root_fd is None:
+            return  # Nothing (safe) to clean here
+
+        # Bounds in-flight subtree walks; acquiring every slot afterwards waits for all of them
+        slots = threading.BoundedSemaphore(self.max_workers * 2)
+        tally = _Tally(job.max_errors)
+        try:
+            job.dev = os.fstat(root_fd).st_dev
+            with os.scandir(root_fd) as it:
+                for entry in it:
+                    if self._cancel.is_set():
+                        break
+                    if any(fnmatch.fnmatch(entry.name, pattern) for pattern in job.protect):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        slots.acquire()
+                        future = pool.submit(self._walk, job, root_fd, entry.name, os.path.join(root, entry.name))
+                        future.add_done_callback(lambda _: slots.release())
+                    else:
+                        self._visit_file(job, root_fd, entry, root, tally)
+        except OSError as e:
+            tally.error(root, e)
+        finally:
+            for _ in range(self.max_workers * 2):
+                slots.acquire()
+            os.close(root_fd)
+            job.merge(tally)
+
+    def _walk(self, job: _Job, parent_fd: int, name: str, path: str):
+        """Walks one top-level subtree on a pool thread."""
+        tally = _Tally(job.max_errors)
+        try:
+            self._walk_dir(job, parent_fd, name, path, tally, 1)
+        except Exception as e:
+            tally.error(path, e)
+        finally:
+            job.merge(tally)
+
+    def _walk_dir(self, job: _Job, parent_fd: int, name: str, path: str, tally: _Tally, depth: int):
+        if self._cancel.is_set():
+            return
+        if depth > MAX_DEPTH:
+            tally.error(path, OSError(f"deeper than {MAX_DEPTH} levels, skipped"))
+            return
+        try:
+            # Fails with ELOOP/ENOTDIR if the entry was swapped for a symlink or file after listing
+            fd = os.open(name, _DIR_FLAGS, dir_fd=parent_fd)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            tally.error(path, e)
+            return
+
+        try:
+            st = os.fstat(fd)
+            if st.st_dev != job.dev:
+                return  # Never cross into other mounts
+            # Recently touched directories are still walked for old files, but kept themselves
+            removable = st.st_mtime < job.cutoff
+
+            # Files stream through; only subdirectory names are collected, so the
+            # listing is closed before recursing (one open fd per level)
+            subdirs = []
+            with os.scandir(fd) as it:
+                for entry in it:
+                    if self._cancel.is_set():
+                        return
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    else:
+                        self._visit_file(job, fd, entry, path, tally)
+            for sub in subdirs:
+                self._walk_dir(job, fd, sub, os.path.join(path, sub), tally, depth + 1)
+        except OSError as e:
+            tally.error(path, e)
+            return
+        finally:
+            os.close(fd)
+
+        # Post-order: contents are gone, drop the directory if it is now empty
+        if removable and not job.dry_run and not self._cancel.is_set():
+            try:
+                os.rmdir(name, dir_fd=parent_fd)
+            except OSError:
+                pass  # Not empty (young files left behind) or no longer a directory
+
+    def _visit_file(self, job: _Job, dir_fd: int, entry: os.DirEntry, dir_path: str, tally: _Tally):
+        if job.suffixes and not entry.name.endswith(job.suffixes):
+            return
+        path = os.path.join(dir_path, entry.name)
+        try:
+            st = os.stat(entry.name, dir_fd=dir_fd, follow_symlinks=False)
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            tally.error(path, e)
+            return
+        # Sockets, FIFOs and device nodes belong to running programs
+        if not (stat.S_ISREG(st.st_mode) or stat.S_ISLNK(st.st_mode)):
+            return
+        if max(st.st_mtime, st.st_ctime) >= job.cutoff:
+            return
+
+        if not job.dry_run:
+            try:
+                # Removes the name in the directory we listed: a symlink is removed, never its target
+                os.unlink(entry.name, dir_fd=dir_fd)
+            except FileNotFoundError:
+                return
+            except OSError as e:
+                tally.error(path, e)
+                return
+        tally.files += 1
+        tally.bytes += st.st_size
@@ -0,0 +1,162 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger("jarvis.core.events")
+
+
+class Topic(Enum):
+    STATS = "stats"    # Periodic system samples
+    ALERTS = "alerts"  # Security alerts (threat_alert frames)
+    LOGS = "logs"      # Tailed system logs and broadcast messages
+    JOBS = "jobs"      # Work queue / fleet job lifecycle
+
+
+class Overflow(Enum):
+    DROP_OLDEST = "drop_oldest"  # Newest data wins (stats: only the latest sample matters)
+    DROP_NEWEST = "drop_newest"  # Keep what is queued, discard the new event
+    SPILL = "spill"              # Never drop: queue past maxsize into the subscriber's spill buffer
+
+
+DEFAULT_OVERFLOW = {
+    Topic.STATS: Overflow.DROP_OLDEST,
+    Topic.ALERTS: Overflow.SPILL,
+    Topic.LOGS: Overflow.DROP_OLDEST,
+    Topic.JOBS: Overflow.DROP_OLDEST,
+}
+
+
+class Subscription:
+    """
+    One consumer's view of the bus: a bounded queue per topic.
+    Events are handed out in publish order across topics.
+    """
+
+    def __init__(self, bus: "EventBus", topics: Iterable[Topic], maxsize: int, overflow: Dict[Topic, Overflow]):
+        self.bus = bus
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.closed = False
+        self._queues: Dict[Topic, Deque[Tuple[int, Any]]] = {topic: deque() for topic in topics}
+        self._ready = asyncio.Event()
+
+    @property
+    def topics(self) -> Set[Topic]:
+        return set(self._queues)
+
+    async def get(self) -> Tuple[Topic, Any]:
+        """Waits for the next event. Raises EOFError once the subscription is closed and drained."""
+        while True:
+            heads = [(queue[0][0], topic) for topic, queue in self._queues.items() if queue]
+            if heads:
+                _, topic = min(heads, key=lambda head: head[0])
+                _, event = self._queues[topic].popleft()
+                return topic, event
+            if self.closed:
+                raise EOFError("subscription closed")
+            self._ready.clear()
+            await self._ready.wait()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tuple[Topic, Any]:
+        try:
+            return await self.get()
+        except EOFError:
+            raise StopAsyncIteration
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """
+    In-process pub/sub.
+    Producers (stats sampler, log tailer, work queue, fleet) publish once;
+    every subscriber (HUD connections, Discord bot, ...) gets its own bounded
+    queue, so a slow consumer never slows down the others: publishing never
+    waits. What happens when a subscriber falls behind is decided per topic by
+    its Overflow policy.
+
+    SPILL topics (alerts) keep queueing past maxsize, up to spill_limit extra
+    events per subscriber. Only a subscriber that is stuck for that long loses
+    its oldest events, so one dead consumer cannot exhaust memory.
+    """
+
+    def __init__(self, spill_limit: int = 10000):
+        self.spill_limit = spill_limit
+        self._subscribers: Dict[Topic, Set[Subscription]] = {topic: set() for topic in Topic}
+        self._seq = itertools.count()
+        self._started_at = time.monotonic()
+        self._counters = {topic: {"published": 0, "delivered": 0, "dropped": 0, "spilled": 0} for topic in Topic}
+
+    def subscribe(self, topics: Iterable[Topic], maxsize: int = 100,
+                  overflow: Optional[Dict[Topic, Overflow]] = None) -> Subscription:
+        topics = set(topics)
+        policies = {topic: (overflow or {}).get(topic, DEFAULT_OVERFLOW[topic]) for topic in topics}
+        sub = Subscription(self, topics, maxsize, policies)
+        for topic in topics:
+            self._subscribers[topic].add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        sub.closed = True
+        for topic in sub.topics:
+            self._subscribers[topic].discard(sub)
+        # Wake the consumer: it drains what is left, then sees EOF
+        sub._ready.set()
+
+    def has_subscribers(self, topic: Topic) -> bool:
+        return bool(self._subscribers[topic])
+
+    async def publish(self, topic: Topic, event: Any):
+        """Delivers to every subscriber. Never waits, whatever the subscribers' state."""
+        self.publish_nowait(topic, event)
+
+    def publish_nowait(self, topic: Topic, event: Any):
+        """For producers that cannot await (sync code and callbacks on the event loop)."""
+        seq = self._begin(topic)
+        for sub in list(self._subscribers[topic]):
+            self._offer(sub, topic, seq, event)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-topic throughput counters."""
+        uptime = max(time.monotonic() - self._started_at, 1e-6)
+        return {
+            topic.value: {
+                **counters,
+                "subscribers": len(self._subscribers[topic]),
+                "published_per_sec": round(counters["published"] / uptime, 3),
+            }
+            for topic, counters in self._counters.items()
+        }
+
+    def _begin(self, topic: Topic) -> int:
+        self._counters[topic]["published"] += 1
+        return next(self._seq)
+
+    def _offer(self, sub: Subscription, topic: Topic, seq: int, event: Any):
+        queue = sub._queues[topic]
+        counters = self._counters[topic]
+        if len(queue) >= sub.maxsize:
+            policy = sub.overflow[topic]
+            if policy is Overflow.DROP_OLDEST:
+                queue.popleft()
+                counters["dropped"] += 1
+            elif policy is Overflow.DROP_NEWEST:
+                counters["dropped"] += 1
+                return
+            elif len(queue) >= sub.maxsize + self.spill_limit:
+                queue.popleft()
+                counters["dropped"] += 1
+                logger.warning(f"Subscriber stuck on '{topic.value}': spill buffer full, dropping oldest event.")
+            else:
+                counters["spilled"] += 1
+        queue.append((seq, event))
+        counters["delivered"] += 1
+        sub._ready.set()
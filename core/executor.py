@@ -1,8 +1,16 @@
 import abc
-import abc
 import asyncio
+import glob
 import logging
 import os
+import random
+import signal
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+from core.cleaner import QuickCleaner, format_bytes, format_category
+from core.metrics import timed, EXECUTOR_COMMAND_SECONDS
+from core.validator import GPG_KEY_ID
 
 logger = logging.getLogger("jarvis.core.executor")
 
@@ -22,42 +30,171 @@ class CommandExecutor(abc.ABC):
         """Add missing GPG key"""
         pass
 
+    async def prepare_update(self) -> Optional[Dict[str, Any]]:
+        """
+        Side-effect-free stage of an update (refresh, resolve, pre-download).
+        Returns a plan for install_prepared_update, or None if unsupported.
+        """
+        return None
+
+    async def install_prepared_update(self, plan: Dict[str, Any]) -> str:
+        """Install a plan produced by prepare_update"""
+        return await self.update_packages()
+
+    def clean_targets(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Cleanup categories for quick_clean.
+        category -> {"roots": [...], "min_age": seconds, "protect": [globs], "suffixes": [...]}
+        """
+        return {}
+
+    async def quick_clean(self) -> str:
+        """Delete temp files, trash and package caches"""
+        cleaner = QuickCleaner(self.clean_targets())
+        if not cleaner.targets:
+            return "Quick clean is not supported on this platform."
+        try:
+            reports = await asyncio.to_thread(lambda: list(cleaner.clean()))
+        except asyncio.CancelledError:
+            cleaner.cancel()
+            raise
+
+        total = sum(r["bytes"] for r in reports)
+        files = sum(r["files"] for r in reports)
+        lines = [f"✅ SUCCESS:\nFreed {format_bytes(total)} ({files:,} files)."]
+        lines += [f"  {format_category(r)}" for r in reports]
+        errors = [sample for r in reports for sample in r["error_samples"]]
+        if errors:
+            lines.append(f"⚠️ {sum(r['errors'] for r in reports):,} entries could not be removed, e.g.:")
+            lines += [f"  {sample}" for sample in errors[:5]]
+        return "\n".join(lines)
+
 class LinuxExecutor(CommandExecutor):
-    async def _run(self, cmd: str, timeout: int = 45) -> str:
+    # Keep existing config files on upgrade instead of prompting
+    DPKG_OPTS = "-o Dpkg::Options::='--force-confdef' -o Dpkg::Options::='--force-confold'"
+
+    @timed(EXECUTOR_COMMAND_SECONDS)
+    async def _exec(self, cmd: str, timeout: int = 45) -> Tuple[int, str, str]:
+        """
+        Runs a shell command and returns (returncode, stdout, stderr).
+        Raises asyncio.TimeoutError if the command does not finish in time.
+        """
         # Dynamic Root Check: If running as root, remove 'sudo' from command
         if os.geteuid() == 0 and cmd.startswith("sudo "):
              cmd = cmd.replace("sudo ", "", 1)
-             
+
+        # Async subprocess execution. Own session, so the whole pipeline can be killed as a group
+        proc = await asyncio.create_subprocess_shell(
+            cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+
+        # Wait for output with timeout
         try:
-            # Async subprocess execution
-            proc = await asyncio.create_subprocess_shell(
-                cmd,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            # Wait for output with timeout
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=float(timeout))
+        except BaseException:
+            # Timeout or cancellation (e.g. a discarded speculative prepare):
+            # never leave apt/dpkg running in the background holding its lock
+            await self._kill(proc)
+            raise
+
+        return proc.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+    @staticmethod
+    async def _kill(proc: asyncio.subprocess.Process):
+        if proc.returncode is not None:
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            # sudo children may not be ours to signal; at least stop the shell
             try:
-                stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=float(timeout))
-            except asyncio.TimeoutError:
-                try:
-                    proc.kill()
-                except:
-                    pass
-                return f"⚠️ ERROR: Command timed out after {timeout} seconds."
-            
-            if proc.returncode == 0:
-                return f"✅ SUCCESS:\n{stdout.decode()[:500]}" 
-            else:
-                return f"❌ FAILED (Code {proc.returncode}):\n{stderr.decode()}"
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await asyncio.shield(proc.wait())
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self, cmd: str, timeout: int = 45) -> str:
+        try:
+            returncode, stdout, stderr = await self._exec(cmd, timeout)
+        except asyncio.TimeoutError:
+            return f"⚠️ ERROR: Command timed out after {timeout} seconds."
         except Exception as e:
             return f"⚠️ ERROR: {str(e)}"
 
+        if returncode == 0:
+            return f"✅ SUCCESS:\n{stdout[:500]}"
+        else:
+            return f"❌ FAILED (Code {returncode}):\n{stderr}"
+
     async def update_packages(self) -> str:
         # Use non-interactive mode and longer timeout for upgrades
         cmd = "export DEBIAN_FRONTEND=noninteractive && sudo apt update && sudo apt -y -o Dpkg::Options::='--force-confdef' -o Dpkg::Options::='--force-confold' upgrade"
         return await self._run(cmd, timeout=300)
 
+    async def prepare_update(self) -> Optional[Dict[str, Any]]:
+        # 1. Refresh package indices
+        returncode, _, stderr = await self._exec("sudo apt-get update -q", timeout=120)
+        if returncode != 0:
+            raise RuntimeError(f"apt-get update failed: {stderr.strip()[:200]}")
+
+        # 2. Resolve the upgrade set (simulation only, nothing is changed)
+        returncode, stdout, stderr = await self._exec("apt-get -s --with-new-pkgs upgrade", timeout=60)
+        if returncode != 0:
+            raise RuntimeError(f"apt-get upgrade simulation failed: {stderr.strip()[:200]}")
+        packages = [line.split()[1] for line in stdout.splitlines() if line.startswith("Inst ")]
+
+        if not packages:
+            return {"packages": [], "download_bytes": 0, "downloaded": True}
+
+        # 3. Size of the archives not yet in the cache ('<uri>' <file> <size> <hash>)
+        download_bytes = 0
+        returncode, stdout, _ = await self._exec("apt-get -qq --print-uris --with-new-pkgs upgrade", timeout=60)
+        if returncode == 0:
+            for line in stdout.splitlines():
+                parts = line.split()
+                if len(parts) >= 3 and parts[0].startswith("'") and parts[2].isdigit():
+                    download_bytes += int(parts[2])
+
+        # 4. Pre-download into /var/cache/apt/archives (no install)
+        returncode, _, stderr = await self._exec("sudo apt-get -d -y -q --with-new-pkgs upgrade", timeout=300)
+        if returncode != 0:
+            logger.warning(f"Pre-download failed, install will fetch packages itself: {stderr.strip()[:200]}")
+
+        return {"packages": packages, "download_bytes": download_bytes, "downloaded": returncode == 0}
+
+    async def install_prepared_update(self, plan: Dict[str, Any]) -> str:
+        if not plan.get("packages"):
+            return "✅ SUCCESS:\nAll packages are already up to date."
+        # Indices are fresh and archives are cached, so this is an install-only step
+        cmd = f"sudo DEBIAN_FRONTEND=noninteractive apt-get -y {self.DPKG_OPTS} --with-new-pkgs upgrade"
+        return await self._run(cmd, timeout=300)
+
+    def clean_targets(self) -> Dict[str, Dict[str, Any]]:
+        homes = glob.glob("/home/*") + [os.path.expanduser("~")]
+        trash = []
+        for home in dict.fromkeys(homes):
+            trash += [os.path.join(home, ".local/share/Trash", sub) for sub in ("files", "info", "expunged")]
+        return {
+            "tmp": {
+                "roots": ["/tmp", "/var/tmp"],
+                "min_age": 24 * 3600,  # Leave files of running programs alone
+                "protect": [".X11-unix", ".ICE-unix", ".XIM-unix", ".font-unix", ".Test-unix",
+                            "systemd-private-*", "snap-private-tmp"],
+            },
+            "trash": {"roots": trash},
+            "package_cache": {
+                "roots": ["/var/cache/apt/archives"],
+                "protect": ["partial", "lock"],
+                "suffixes": [".deb"],
+            },
+        }
+
     async def check_firewall(self) -> str:
         return await self._run("sudo iptables -L")
 
@@ -68,13 +205,16 @@ class LinuxExecutor(CommandExecutor):
         if key_id == "EDA3E22630349F1C":
             # ProtonVPN specific robust fix (Direct Download)
             cmd = "wget -q -O - https://repo.protonvpn.com/debian/public_key.asc | sudo apt-key add -"
-        else:
+        elif key_id and GPG_KEY_ID.match(key_id):
             # Fallback for others
             cmd = f"sudo apt-key adv --keyserver keyserver.ubuntu.com --recv-keys {key_id}"
+        else:
+            return f"⚠️ ERROR: Invalid GPG key ID: {key_id!r}"
             
         return await self._run(cmd)
 
 class WindowsExecutor(CommandExecutor):
+    @timed(EXECUTOR_COMMAND_SECONDS)
     async def _run(self, cmd: str, timeout: int = 45) -> str:
         try:
              proc = await asyncio.create_subprocess_shell(
@@ -90,12 +230,48 @@ class WindowsExecutor(CommandExecutor):
     async def update_packages(self) -> str:
         return await self._run("winget upgrade --all", timeout=300)
 
+    def clean_targets(self) -> Dict[str, Dict[str, Any]]:
+        windir = os.environ.get("WINDIR", r"C:\Windows")
+        return {
+            "tmp": {
+                "roots": list(dict.fromkeys([tempfile.gettempdir(), os.path.join(windir, "Temp")])),
+                "min_age": 24 * 3600,
+            },
+        }
+
     async def check_firewall(self) -> str:
         return await self._run("netsh advfirewall show allprofiles")
 
     async def add_gpg_key(self, key_id: str) -> str:
         return "GPG Key management is Linux-specific feature."
 
+class SimulatedExecutor(CommandExecutor):
+    """
+    Stand-in that never touches the system (no apt, iptables or file deletion).
+    Used for fleet drills with several local agents and for benchmarks.
+    """
+    def __init__(self, latency: float = 0.5, failure_rate: float = 0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+
+    async def _run(self, cmd: str, timeout: int = 45) -> str:
+        await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            return f"❌ FAILED (Code 1):\n[simulated] {cmd}"
+        return f"✅ SUCCESS:\n[simulated] {cmd}"
+
+    async def update_packages(self) -> str:
+        return await self._run("apt update && apt upgrade")
+
+    async def check_firewall(self) -> str:
+        return await self._run("iptables -L")
+
+    async def add_gpg_key(self, key_id: str) -> str:
+        return await self._run(f"apt-key adv --recv-keys {key_id}")
+
+    async def quick_clean(self) -> str:
+        return await self._run("quick_clean")
+
 class ExecutorFactory:
     @staticmethod
     def get_executor(os_type: str) -> CommandExecutor:
@@ -103,5 +279,7 @@ class ExecutorFactory:
             return LinuxExecutor()
         elif os_type == "windows":
             return WindowsExecutor()
+        elif os_type == "simulated":
+            return SimulatedExecutor()
         else:
             raise ValueError(f"Unsupported OS: {os_type}")
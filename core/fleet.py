@@ -0,0 +1,276 @@
+import asyncio
+import hmac
+import json
+import logging
+import platform
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import psutil
+
+from core.agent import HybridAgent
+from core.executor import CommandExecutor
+from core.validator import SecurityValidator
+
+logger = logging.getLogger("jarvis.core.fleet")
+
+# Actions the core may fan out to remote hosts. Agents enforce the same list locally.
+FLEET_ALLOW_LIST = {
+    "system_monitor",
+    "security_scan_ports",
+    "update_system",
+    "quick_clean",
+    "fix_system_issue",
+}
+
+
+class FleetCoordinator:
+    """
+    Core side of Fleet Mode.
+    JARVIS agents on other machines register over a persistent WebSocket.
+    The core fans allow-listed actions out to many hosts at once (bounded by
+    fan_out), streams per-host results back and keeps the latest stats of
+    every host for a fleet-wide view.
+    """
+
+    def __init__(self, token: Optional[str], fan_out: int = 8, job_timeout: float = 600.0):
+        self.token = token
+        self.fan_out = fan_out
+        self.job_timeout = job_timeout
+        self.hosts: Dict[str, Dict[str, Any]] = {}
+
+    async def serve(self, websocket):
+        """Handles one agent connection (an accepted Starlette WebSocket) until it drops."""
+        try:
+            hello = await asyncio.wait_for(websocket.receive_json(), timeout=10.0)
+        except Exception:
+            await websocket.close(code=1002)
+            return
+
+        if not isinstance(hello, dict) or not self._token_ok(hello.get("token")):
+            host_name = hello.get("host") if isinstance(hello, dict) else None
+            logger.warning(f"⛔ Fleet registration rejected for '{host_name}' (bad token).")
+            await websocket.close(code=1008)
+            return
+
+        name = str(hello.get("host") or uuid.uuid4().hex[:8])
+        previous = self.hosts.get(name)
+        if previous:
+            # Agent reconnected before its old socket timed out: the new session wins
+            self._fail_pending(previous, "superseded by a new connection")
+            try:
+                await previous["websocket"].close()
+            except Exception:
+                pass
+
+        host = {
+            "websocket": websocket,
+            "os": hello.get("os", "unknown"),
+            "connected_at": time.time(),
+            "stats": {},
+            "pending": {},
+        }
+        self.hosts[name] = host
+        logger.info(f"🖧 Fleet host registered: {name} ({host['os']}). {len(self.hosts)} online.")
+
+        try:
+            while True:
+                msg = await websocket.receive_json()
+                msg_type = msg.get("type")
+                if msg_type == "result":
+                    future = host["pending"].pop(msg.get("job_id"), None)
+                    if future and not future.done():
+                        future.set_result(msg)
+                elif msg_type == "stats":
+                    host["stats"] = msg.get("data", {})
+        except Exception as e:
+            logger.info(f"🖧 Fleet host {name} disconnected: {e or type(e).__name__}")
+        finally:
+            if self.hosts.get(name) is host:
+                del self.hosts[name]
+            self._fail_pending(host, "host disconnected")
+
+    def _token_ok(self, token: Any) -> bool:
+        if not self.token or not isinstance(token, str):
+            return False
+        # Compared as bytes: compare_digest rejects non-ASCII str
+        return hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def list_hosts(self) -> List[Dict[str, Any]]:
+        return [
+            {"host": name, "os": h["os"], "connected_at": h["connected_at"], "stats": h["stats"]}
+            for name, h in self.hosts.items()
+        ]
+
+    def aggregate_stats(self) -> Dict[str, Any]:
+        stats = [h["stats"] for h in self.hosts.values() if h["stats"]]
+        if not stats:
+            return {"hosts": len(self.hosts), "reporting": 0}
+        return {
+            "hosts": len(self.hosts),
+            "reporting": len(stats),
+            "cpu_avg": round(sum(s.get("cpu", 0) for s in stats) / len(stats), 1),
+            "cpu_max": max(s.get("cpu", 0) for s in stats),
+            "ram_avg": round(sum(s.get("ram", 0) for s in stats) / len(stats), 1),
+            "net_sent_speed": sum(s.get("net_sent_speed", 0) for s in stats),
+            "net_recv_speed": sum(s.get("net_recv_speed", 0) for s in stats),
+        }
+
+    async def run(self, action: str, param: Optional[Dict[str, Any]] = None,
+                  hosts: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Runs an allow-listed action on the given hosts (default: all online).
+        Yields one result per host as soon as it arrives.
+        """
+        if action not in FLEET_ALLOW_LIST:
+            raise PermissionError(f"'{action}' is not allowed in Fleet Mode.")
+        param_error = SecurityValidator.validate_params(action, param)
+        if param_error:
+            raise ValueError(param_error)
+
+        targets = hosts or list(self.hosts)
+        slots = asyncio.Semaphore(self.fan_out)
+
+        async def run_one(name: str) -> Dict[str, Any]:
+            async with slots:
+                return await self._dispatch(name, action, param or {})
+
+        logger.info(f"🖧 Fleet run '{action}' on {len(targets)} hosts (fan-out {self.fan_out}).")
+        tasks = [asyncio.create_task(run_one(name)) for name in targets]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _dispatch(self, name: str, action: str, param: Dict[str, Any]) -> Dict[str, Any]:
+        started = time.monotonic()
+        host = self.hosts.get(name)
+        if host is None:
+            return {"host": name, "status": "offline", "msg": "Host is not connected.", "elapsed": 0.0}
+
+        job_id = uuid.uuid4().hex
+        future = asyncio.get_running_loop().create_future()
+        host["pending"][job_id] = future
+        try:
+            await host["websocket"].send_json({"type": "run", "job_id": job_id, "action": action, "param": param})
+            reply = await asyncio.wait_for(future, timeout=self.job_timeout)
+            status, msg = reply.get("status", "done"), reply.get("msg", "")
+        except asyncio.TimeoutError:
+            status, msg = "timeout", f"No result after {self.job_timeout:.0f} seconds."
+        except Exception as e:
+            status, msg = "error", str(e)
+        finally:
+            host["pending"].pop(job_id, None)
+        return {"host": name, "status": status, "msg": msg, "elapsed": round(time.monotonic() - started, 3)}
+
+    @staticmethod
+    def _fail_pending(host: Dict[str, Any], reason: str):
+        for future in host["pending"].values():
+            if not future.done():
+                future.set_exception(ConnectionError(reason))
+        host["pending"].clear()
+
+
+class FleetAgent:
+    """
+    Host side of Fleet Mode.
+    Keeps a persistent connection to the core (reconnecting with backoff),
+    pushes local stats and runs actions the core sends through the local
+    HybridAgent and executor.
+    """
+
+    def __init__(self, core_url: str, token: str, executor: CommandExecutor,
+                 host: Optional[str] = None, stats_interval: float = 5.0):
+        self.core_url = core_url
+        self.token = token
+        self.executor = executor
+        self.host = host or platform.node()
+        self.stats_interval = stats_interval
+        self.agent = HybridAgent()
+
+    async def run_forever(self):
+        import websockets
+
+        backoff = 1.0
+        while True:
+            try:
+                async with websockets.connect(self.core_url) as ws:
+                    await ws.send(json.dumps({
+                        "type": "register",
+                        "host": self.host,
+                        "os": platform.system().lower(),
+                        "token": self.token,
+                    }))
+                    logger.info(f"🖧 Connected to fleet core {self.core_url} as '{self.host}'.")
+                    backoff = 1.0
+                    await self._session(ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Fleet core unreachable ({e or type(e).__name__}).")
+
+            # Exponential backoff with jitter so a restarted core is not stampeded
+            delay = backoff + random.uniform(0, backoff / 2)
+            logger.info(f"Reconnecting to fleet core in {delay:.1f}s...")
+            await asyncio.sleep(delay)
+            backoff = min(backoff * 2, 60.0)
+
+    async def _session(self, ws):
+        stats_task = asyncio.create_task(self._push_stats(ws))
+        jobs = set()
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("type") == "run":
+                    job = asyncio.create_task(self._run_job(ws, msg))
+                    jobs.add(job)
+                    job.add_done_callback(jobs.discard)
+        finally:
+            stats_task.cancel()
+            for job in jobs:
+                job.cancel()
+
+    async def _run_job(self, ws, msg: Dict[str, Any]):
+        action = msg.get("action")
+        param = msg.get("param") or {}
+        param_error = SecurityValidator.validate_params(action, param)
+        if action not in FLEET_ALLOW_LIST:
+            result = {"status": "blocked", "msg": f"⛔ '{action}' is not allowed in Fleet Mode on this host."}
+        elif param_error:
+            logger.warning(f"Fleet job {msg.get('job_id')} rejected: {param_error}")
+            result = {"status": "blocked", "msg": f"⛔ {param_error}"}
+        else:
+            logger.info(f"Fleet job {msg.get('job_id')}: {action}")
+            try:
+                # The core operator approved this run; the local allow-list still applies
+                result = await self.agent.execute_action(
+                    {"action": action, "param": param}, self.executor, bypass_validator=True
+                )
+            except Exception as e:
+                # Always answer, or the core waits for the full job timeout
+                logger.error(f"Fleet job {msg.get('job_id')} failed: {e}")
+                result = {"status": "error", "msg": f"⚠️ ERROR: {e}"}
+        try:
+            await ws.send(json.dumps({"type": "result", "job_id": msg.get("job_id"), **result}))
+        except Exception as e:
+            logger.warning(f"Could not report fleet job {msg.get('job_id')} (core disconnected?): {e}")
+
+    async def _push_stats(self, ws):
+        net = psutil.net_io_counters()
+        prev_sent, prev_recv, prev_time = net.bytes_sent, net.bytes_recv, time.monotonic()
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            net = psutil.net_io_counters()
+            now = time.monotonic()
+            elapsed = max(now - prev_time, 1e-6)
+            await ws.send(json.dumps({"type": "stats", "data": {
+                "cpu": psutil.cpu_percent(interval=None),
+                "ram": psutil.virtual_memory().percent,
+                "net_sent_speed": int((net.bytes_sent - prev_sent) / elapsed),
+                "net_recv_speed": int((net.bytes_recv - prev_recv) / elapsed),
+            }}))
+            prev_sent, prev_recv, prev_time = net.bytes_sent, net.bytes_recv, now
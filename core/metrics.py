@@ -0,0 +1,299 @@
+import asyncio
+import bisect
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("jarvis.core.metrics")
+
+# JARVIS_METRICS=0 turns instrumentation into a no-op (decorators return the original function)
+ENABLED = os.getenv("JARVIS_METRICS", "1") != "0"
+
+# Seconds. Covers fast reflex replies up to slow package upgrades.
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Sharded:
+    """
+    Lock-free writes: every thread increments its own shard (a plain list).
+    The lock is only taken when a thread creates its shard and when scraping.
+    """
+
+    def __init__(self, width: int):
+        self._width = width
+        self._local = threading.local()
+        self._shards: List[list] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> list:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = [0] * self._width
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _totals(self) -> list:
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self._width
+
+
+class Counter(_Sharded):
+    def __init__(self, name: str, help_text: str, labels: Tuple[Tuple[str, str], ...] = ()):
+        super().__init__(1)
+        self.name, self.help, self.labels = name, help_text, labels
+
+    def inc(self, amount: float = 1):
+        self._shard()[0] += amount
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {self._totals()[0]}"]
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labels: Tuple[Tuple[str, str], ...] = ()):
+        self.name, self.help, self.labels = name, help_text, labels
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels)} {self.value}"]
+
+
+class Histogram(_Sharded):
+    """Fixed buckets; layout of a shard: [bucket_0 .. bucket_n, +Inf, sum, count]."""
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[Tuple[str, str], ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(len(buckets) + 3)
+        self.name, self.help, self.labels = name, help_text, labels
+        self.buckets = buckets
+
+    def observe(self, value: float):
+        shard = self._shard()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-2] += value
+        shard[-1] += 1
+
+    def time(self) -> "_Timer":
+        """Context manager: observes the elapsed wall time (also across awaits)."""
+        return _Timer(self)
+
+    def render(self) -> List[str]:
+        totals = self._totals()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), totals):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            le_label = f'le="{le}"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, le_label)} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {totals[-2]}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {totals[-1]}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if ENABLED:
+            self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    """Holds all metrics and renders them in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Tuple], object] = {}
+        self._types: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]] = []
+        self._lock = threading.Lock()
+
+    def _get(self, kind: str, cls, name: str, help_text: str, labels: Dict[str, str], **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = cls(name, help_text, key[1], **kwargs)
+                self._metrics[key] = metric
+                self._types.setdefault(name, (kind, help_text))
+            return metric
+
+    def counter(self, name: str, help_text: str, **labels) -> Counter:
+        return self._get("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str, **labels) -> Gauge:
+        return self._get("gauge", Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                  **labels) -> Histogram:
+        return self._get("histogram", Histogram, name, help_text, labels, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], List[Tuple[str, str, str, Dict[str, str], float]]]):
+        """collector() -> [(name, type, help, labels, value), ...], evaluated at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            types = dict(self._types)
+        by_name: Dict[str, List[str]] = {}
+        for metric in metrics:
+            by_name.setdefault(metric.name, []).extend(metric.render())
+
+        for collector in self._collectors:
+            try:
+                samples = collector()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                types.setdefault(name, (kind, help_text))
+                label_pairs = tuple(sorted(labels.items()))
+                by_name.setdefault(name, []).append(f"{name}{_format_labels(label_pairs)} {value}")
+
+        out = []
+        for name, lines in by_name.items():
+            kind, help_text = types[name]
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+
+def timed(histogram: Histogram):
+    """Decorator: records the latency of a sync or async function."""
+    def decorator(fn):
+        if not ENABLED:
+            return fn
+
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+# --- Hot-path metrics ---
+AGENT_PROCESS_SECONDS = registry.histogram(
+    "jarvis_agent_process_input_seconds", "Intent parsing latency (LLM or reflex).")
+AGENT_EXECUTE_SECONDS = registry.histogram(
+    "jarvis_agent_execute_action_seconds", "Validation plus execution latency of an action.")
+EXECUTOR_COMMAND_SECONDS = registry.histogram(
+    "jarvis_executor_command_seconds", "Wall time of shell commands run by the executor.")
+LOG_READ_SECONDS = registry.histogram(
+    "jarvis_log_read_seconds", "Time to read new lines from a tailed log file.")
+WS_SEND_SECONDS = registry.histogram(
+    "jarvis_ws_send_seconds", "Time to push one frame to a HUD WebSocket (incl. waiting for the send lock).")
+WS_FRAMES_SENT = registry.counter(
+    "jarvis_ws_frames_sent_total", "Frames pushed to HUD WebSockets.")
+LOOP_LAG_SECONDS = registry.gauge(
+    "jarvis_event_loop_lag_seconds", "Most recent event loop scheduling delay.")
+LOOP_LAG_HISTOGRAM = registry.histogram(
+    "jarvis_event_loop_lag_distribution_seconds", "Distribution of event loop scheduling delay.")
+
+
+async def monitor_loop_lag(interval: float = 0.5):
+    """A sleep that wakes up late means something blocked the event loop."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag = max(time.perf_counter() - start - interval, 0.0)
+        LOOP_LAG_SECONDS.set(lag)
+        LOOP_LAG_HISTOGRAM.observe(lag)
+
+
+class SamplingProfiler:
+    """
+    Opt-in statistical profiler.
+    A background thread samples the stack of every other thread at a fixed
+    interval and counts them as folded stacks ("a;b;c N"), the input format
+    of flamegraph.pl / speedscope. Overhead scales with the interval only.
+    """
+
+    def __init__(self, interval: float = 0.01, max_stacks: int = 10000):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples: StackCounter = StackCounter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="jarvis-profiler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started (every {self.interval * 1000:.0f} ms).")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                key = ";".join([names.get(thread_id, str(thread_id))] + stack[::-1])
+                if key in self.samples or len(self.samples) < self.max_stacks:
+                    self.samples[key] += 1
@@ -2,19 +2,28 @@ import os
 import hashlib
 import json
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Tuple
+
+from core.metrics import timed, LOG_READ_SECONDS
 
 class SmartLogReader:
     """
     Reads log files efficiently by only fetching new lines (Diff-Only).
     Keeps track of file offsets to minimize I/O.
+
+    state_file=None keeps offsets in memory only.
+    start_at_end=True skips what a file already contains the first time it is seen (tail -f).
+    max_bytes > 0 caps one read; the rest is picked up by the next call.
     """
-    def __init__(self, state_file: str = "log_offsets.json"):
+    def __init__(self, state_file: Optional[str] = "log_offsets.json", start_at_end: bool = False,
+                 max_bytes: int = 0):
         self.state_file = state_file
+        self.start_at_end = start_at_end
+        self.max_bytes = max_bytes
         self.offsets = self._load_offsets()
 
     def _load_offsets(self) -> Dict[str, int]:
-        if os.path.exists(self.state_file):
+        if self.state_file and os.path.exists(self.state_file):
             try:
                 with open(self.state_file, 'r') as f:
                     return json.load(f)
@@ -23,15 +32,22 @@ class SmartLogReader:
         return {}
 
     def _save_offsets(self):
+        if not self.state_file:
+            return
         with open(self.state_file, 'w') as f:
             json.dump(self.offsets, f)
 
+    @timed(LOG_READ_SECONDS)
     def read_new_lines(self, filepath: str) -> List[str]:
         if not os.path.exists(filepath):
             return []
 
-        last_offset = self.offsets.get(filepath, 0)
         current_size = os.path.getsize(filepath)
+        if filepath not in self.offsets and self.start_at_end:
+            self.offsets[filepath] = current_size
+            self._save_offsets()
+            return []
+        last_offset = self.offsets.get(filepath, 0)
 
         # If file was rotated (smaller than last specific offset), reset
         if current_size < last_offset:
@@ -39,10 +55,14 @@ class SmartLogReader:
 
         new_lines = []
         try:
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+            with open(filepath, 'rb') as f:
                 f.seek(last_offset)
-                new_lines = f.readlines()
-                self.offsets[filepath] = f.tell()
+                data = f.read(self.max_bytes) if self.max_bytes > 0 else f.read()
+                if self.max_bytes > 0 and len(data) == self.max_bytes and b"\n" in data:
+                    # Capped read: stop after the last complete line
+                    data = data[:data.rindex(b"\n") + 1]
+                self.offsets[filepath] = last_offset + len(data)
+                new_lines = data.decode('utf-8', errors='ignore').splitlines()
         except Exception as e:
             print(f"Error reading {filepath}: {e}")
             return []
@@ -118,8 +138,8 @@ class TokenOptimizer:
     """
     Facade for all optimization strategies.
     """
-    def __init__(self):
-        self.reader = SmartLogReader()
+    def __init__(self, reader: Optional[SmartLogReader] = None):
+        self.reader = reader or SmartLogReader()
         self.deduplicator = LogDeduplicator()
         self.pruner = ContextPruner()
 
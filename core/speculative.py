@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from core.cleaner import QuickCleaner, format_bytes, format_category
+from core.executor import CommandExecutor
+
+logger = logging.getLogger("jarvis.core.speculative")
+
+
+class SpeculativePreparer:
+    """
+    Speculative Stage.
+    While the user decides on an approval-gated action, runs its safe,
+    side-effect-free part in the background (e.g. refresh indices, resolve
+    and pre-download packages, dry-run cleanups) and measures the real impact.
+    Approving claims the prepared plan; denying or expiring discards it.
+    """
+
+    def __init__(self, ttl: float = 600.0):
+        # A plan older than this is stale (indices may have moved on)
+        self.ttl = ttl
+        self._preparers = {
+            "update_system": self._prepare_update,
+            "quick_clean": self._prepare_clean,
+        }
+        self._action: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._started_at = 0.0
+        self._announced = False
+        # Partial results streamed by the current preparer before it finishes.
+        # A new list per preparation: a cancelled preparer still finishing in
+        # its thread can only append to its own, orphaned list.
+        self._updates: List[str] = []
+
+    def start(self, action_data: Dict[str, Any], executor: CommandExecutor) -> bool:
+        """
+        Starts preparing the action in the background. Replaces any previous preparation.
+        Returns True if a preparation was started.
+        """
+        self.discard()
+        action = action_data.get("action")
+        preparer = self._preparers.get(action)
+        if preparer is None or executor is None:
+            return False
+
+        logger.info(f"Speculatively preparing '{action}' while awaiting approval.")
+        self._action = action
+        self._updates = []
+        self._task = asyncio.create_task(preparer(action_data, executor, self._updates))
+        self._started_at = time.monotonic()
+        self._announced = False
+        return True
+
+    @property
+    def active(self) -> bool:
+        """True while there is impact left to report."""
+        return self._task is not None and not self._announced
+
+    def is_expired(self) -> bool:
+        return self._task is not None and time.monotonic() - self._started_at > self.ttl
+
+    def poll_impact(self) -> Optional[str]:
+        """
+        Non-blocking. Returns impact lines reported since the last poll,
+        ending with the measured impact once the preparation finishes.
+        Discards the preparation if it has expired.
+        """
+        if self._task is None:
+            return None
+        if self.is_expired():
+            logger.info(f"Prepared '{self._action}' expired. Discarding.")
+            self.discard()
+            return None
+
+        # Only the event loop touches the list (threads hand lines over via call_soon_threadsafe)
+        lines = self._updates[:]
+        self._updates.clear()
+        if self._task.done() and not self._announced:
+            self._announced = True
+            if self._task.cancelled() or isinstance(self._task.exception(), NotImplementedError):
+                pass
+            elif self._task.exception() is not None:
+                lines.append(f"⚠️ Could not pre-check '{self._action}': {self._task.exception()}")
+            else:
+                lines.append(self._task.result().get("impact"))
+        return "\n".join(lines) if lines else None
+
+    async def claim(self, action: str) -> Optional[Dict[str, Any]]:
+        """
+        Hands over the prepared plan for an approved action, waiting for it to finish if needed.
+        Returns None if nothing usable was prepared (caller falls back to the full action).
+        """
+        if self._task is None or self._action != action:
+            return None
+        if self.is_expired():
+            logger.info(f"Prepared '{action}' expired. Running full action instead.")
+            self.discard()
+            return None
+
+        task = self._task
+        self._task = None
+        self._action = None
+        try:
+            return await task
+        except asyncio.CancelledError:
+            return None
+        except Exception as e:
+            logger.warning(f"Preparation of '{action}' failed, running full action instead: {e}")
+            return None
+
+    def discard(self):
+        if self._task is not None:
+            if not self._task.done():
+                self._task.cancel()
+            elif not self._task.cancelled():
+                self._task.exception()  # Mark as retrieved
+            logger.info(f"Discarded prepared '{self._action}'.")
+        self._task = None
+        self._action = None
+        self._announced = False
+        self._updates = []
+
+    async def _prepare_update(self, action_data: Dict[str, Any], executor: CommandExecutor,
+                              updates: List[str]) -> Dict[str, Any]:
+        plan = await executor.prepare_update()
+        if plan is None:
+            raise NotImplementedError("update preparation is not supported on this platform")
+
+        count = len(plan["packages"])
+        if count == 0:
+            impact = "✅ Pre-check complete: system is already up to date. Nothing will be installed."
+        else:
+            size = format_bytes(plan["download_bytes"])
+            cached = "already downloaded" if plan.get("downloaded") else "will be downloaded on approval"
+            impact = f"📦 Pre-check complete: {count} packages will be upgraded ({size}, {cached})."
+        plan["impact"] = impact
+        return plan
+
+    async def _prepare_clean(self, action_data: Dict[str, Any], executor: CommandExecutor,
+                             updates: List[str]) -> Dict[str, Any]:
+        cleaner = QuickCleaner(executor.clean_targets())
+        if not cleaner.targets:
+            raise NotImplementedError("quick_clean is not supported on this platform")
+        loop = asyncio.get_running_loop()
+
+        def scan():
+            reports = []
+            for report in cleaner.scan():
+                reports.append(report)
+                loop.call_soon_threadsafe(updates.append, f"🧹 {format_category(report)}")
+            return reports
+
+        try:
+            reports = await asyncio.to_thread(scan)
+        except asyncio.CancelledError:
+            cleaner.cancel()
+            raise
+
+        total = sum(r["bytes"] for r in reports)
+        files = sum(r["files"] for r in reports)
+        impact = f"🧹 Pre-check complete: {format_bytes(total)} reclaimable in {files:,} files."
+        return {"reports": reports, "impact": impact}
@@ -1,10 +1,14 @@
 import logging
-from typing import List
+import re
+from typing import Any, List, Optional
 
 logger = logging.getLogger("jarvis.core.shield")
 
 from enum import Enum
 
+# GPG key IDs / fingerprints: hex only, they end up in a shell command
+GPG_KEY_ID = re.compile(r"^[0-9A-Fa-f]{8,40}$")
+
 class ActionStatus(Enum):
     SAFE = "safe"
     APPROVAL_NEEDED = "approval_needed"
@@ -39,7 +43,7 @@ class SecurityValidator:
         }
         
         self.IMPACTS = {
-            "quick_clean": "This will permanently delete files in /tmp and empty the Trash.",
+            "quick_clean": "This will permanently delete temp files older than a day, empty the Trash and clear package caches.",
             "update_system": "System packages will be upgraded. This may require a reboot.",
             "block_ip": "This IP will be unable to access any service on this machine.",
             "stop_service": "The selected service will stop immediately. Dependent apps may fail.",
@@ -68,3 +72,19 @@ class SecurityValidator:
         Returns a human-readable impact description for the UI.
         """
         return self.IMPACTS.get(action_name, "Unknown action. Proceed with extreme caution.")
+
+    @staticmethod
+    def validate_params(action_name: str, param: Any) -> Optional[str]:
+        """
+        Checks the parameters of an action (they may come from the LLM or a remote core).
+        Returns the reason they are rejected, or None if they are safe to use.
+        """
+        if param is None:
+            return None
+        if not isinstance(param, dict):
+            return "Action parameters must be an object."
+        if action_name == "fix_system_issue" and param.get("target") == "gpg":
+            key_id = param.get("key_id")
+            if not isinstance(key_id, str) or not GPG_KEY_ID.match(key_id):
+                return f"Invalid GPG key ID: {key_id!r} (expected 8-40 hex digits)."
+        return None
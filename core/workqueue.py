@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from core.events import EventBus, Topic
+
+logger = logging.getLogger("jarvis.core.workqueue")
+
+Job = Callable[[], Awaitable[Any]]
+
+
+class WorkQueue:
+    """
+    Bounded async work queue shared by every front-end (HUD WebSocket, Discord).
+    A fixed pool of worker tasks drains it, so a busy front-end can never pile up
+    unbounded work on the event loop. Submitting to a full queue raises
+    asyncio.QueueFull (backpressure: the caller tells the user to retry).
+
+    Jobs with the same key (e.g. a chat channel) run one at a time, in order.
+    Jobs submitted with a coalesce_key (e.g. channel + author) replace a job
+    with the same coalesce_key that is still waiting, so a burst of messages
+    from one user costs a single queue slot. Other users' jobs are never replaced.
+    Job lifecycle events are published on the JOBS topic when a bus is given.
+    """
+
+    def __init__(self, workers: int = 4, maxsize: int = 32, bus: Optional[EventBus] = None):
+        self.workers = workers
+        self.bus = bus
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self._waiting: Dict[Hashable, Dict[str, Any]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._inflight: Dict[Hashable, int] = {}
+        self._tasks = []
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Work queue online ({self.workers} workers, capacity {self._queue.maxsize}).")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def qsize(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, key: Hashable, fn: Job, coalesce_key: Optional[Hashable] = None) -> asyncio.Future:
+        """
+        Queues fn() and returns a future for its result.
+        The future of a job superseded by coalescing is cancelled, so the
+        caller can tell its user the request was replaced.
+        """
+        future = asyncio.get_running_loop().create_future()
+
+        job = self._waiting.get((key, coalesce_key)) if coalesce_key is not None else None
+        if job is not None:
+            logger.info(f"Coalescing burst from {coalesce_key}: newest request replaces the queued one.")
+            job["future"].cancel()
+            self._publish(key, "coalesced")
+            job["fn"] = fn
+            job["future"] = future
+            return future
+
+        job = {"key": key, "coalesce_key": coalesce_key, "fn": fn, "future": future}
+        self._queue.put_nowait(job)
+        self._inflight[key] = self._inflight.get(key, 0) + 1
+        if coalesce_key is not None:
+            self._waiting[(key, coalesce_key)] = job
+        self._publish(key, "queued")
+        return future
+
+    async def run(self, key: Hashable, fn: Job) -> Any:
+        """Submits fn() and waits for its result."""
+        return await self.submit(key, fn)
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            key = job["key"]
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            try:
+                async with lock:
+                    # Started: from here on a newer request queues behind this one
+                    waiting_key = (key, job["coalesce_key"])
+                    if self._waiting.get(waiting_key) is job:
+                        del self._waiting[waiting_key]
+                    future = job["future"]
+                    self._publish(key, "started")
+                    try:
+                        result = await job["fn"]()
+                    except Exception as e:
+                        logger.error(f"Job for {key} failed: {e}")
+                        self._publish(key, "failed")
+                        if not future.done():
+                            future.set_exception(e)
+                    else:
+                        self._publish(key, "done")
+                        if not future.done():
+                            future.set_result(result)
+            finally:
+                self._inflight[key] -= 1
+                if not self._inflight[key]:
+                    del self._inflight[key]
+                    self._locks.pop(key, None)
+                self._queue.task_done()
+
+    def _publish(self, key: Hashable, state: str):
+        if self.bus is not None:
+            self.bus.publish_nowait(Topic.JOBS, {"type": "job", "key": str(key), "state": state,
+                                                 "queued": self._queue.qsize()})
+
+
+class RateLimiter:
+    """
+    Token bucket per key: `rate` requests per `per` seconds, bursts up to `burst`.
+    """
+
+    def __init__(self, rate: float = 5, per: float = 60.0, burst: Optional[int] = None):
+        self.refill = rate / per
+        self.burst = burst if burst is not None else rate
+        self._buckets: Dict[Hashable, Tuple[float, float]] = {}
+
+    def allow(self, key: Hashable) -> bool:
+        now = time.monotonic()
+        tokens, last = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.refill)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return False
+        self._buckets[key] = (tokens - 1, now)
+        return True
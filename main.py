@@ -3,12 +3,20 @@ import sys
 import logging
 import asyncio
 from fastapi import FastAPI, WebSocket
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from core.detect import OSDetector
 from core.agent import HybridAgent
 from core.executor import ExecutorFactory
+from core.workqueue import WorkQueue
+from core.events import EventBus, Topic
+from core.optimizer import SmartLogReader, TokenOptimizer
+from core import metrics
+from core.fleet import FleetCoordinator, FLEET_ALLOW_LIST
+from core.validator import ActionStatus
 import psutil
 import json
+import time
 
 # Configure Logging
 logging.basicConfig(
@@ -31,8 +39,27 @@ app.add_middleware(
 os_detector = OSDetector()
 runtime_os = os_detector.detect_environment()
 
+# In-process pub/sub: producers publish once, every HUD/Discord consumer subscribes
+event_bus = EventBus()
+
+# Shared by the HUD and Discord: blocking LLM calls and actions never run on the event loop directly
+work_queue = WorkQueue(bus=event_bus)
+discord_bot = None
+background_tasks = []
+
+# Opt-in sampling profiler (JARVIS_PROFILE=1), folded stacks served at /metrics/profile
+profiler = metrics.SamplingProfiler() if os.getenv("JARVIS_PROFILE") == "1" else None
+
+# Fleet Mode: remote agents register here (disabled unless JARVIS_FLEET_TOKEN is set)
+fleet = FleetCoordinator(os.getenv("JARVIS_FLEET_TOKEN"), fan_out=int(os.getenv("JARVIS_FLEET_FANOUT", "8")))
+
+# Agents connect to their own listener: the HUD app (/ws, /metrics, ...) has no
+# authentication and stays on localhost even when the fleet port is exposed
+fleet_app = FastAPI(title="Project JARVIS Fleet")
+
 @app.on_event("startup")
 async def startup_event():
+    global discord_bot
     logger.info("Initializing JARVIS Core...")
     logger.info(f"Running on: {runtime_os}")
     
@@ -51,10 +78,143 @@ async def startup_event():
         except Exception as e:
             logger.warning(f"Could not adjust nice value: {e}")
 
+    await work_queue.start()
+    background_tasks.append(asyncio.create_task(stats_sampler()))
+    if metrics.ENABLED:
+        background_tasks.append(asyncio.create_task(metrics.monitor_loop_lag()))
+    if profiler:
+        profiler.start()
+    tail_paths = [p for p in os.getenv("JARVIS_TAIL_LOGS", "").split(",") if p]
+    if tail_paths:
+        background_tasks.append(asyncio.create_task(log_tailer(tail_paths)))
+
+    # 2. Discord Remote Control (optional)
+    token = os.getenv("DISCORD_BOT_TOKEN")
+    if token:
+        try:
+            from skills.discord_bot import JarvisDiscordBot
+            discord_bot = JarvisDiscordBot(token, work_queue, ExecutorFactory.get_executor(runtime_os), bus=event_bus)
+            asyncio.create_task(discord_bot.start())
+        except (ImportError, ValueError) as e:
+            logger.warning(f"Discord bridge disabled: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if discord_bot:
+        await discord_bot.stop()
+    for task in background_tasks:
+        task.cancel()
+    if profiler:
+        profiler.stop()
+    await work_queue.stop()
+
+async def stats_sampler(interval: float = 1.0):
+    """Single stats producer for all consumers (idles while nobody is subscribed)."""
+    net = psutil.net_io_counters()
+    prev_sent, prev_recv, prev_time = net.bytes_sent, net.bytes_recv, time.monotonic()
+    while True:
+        await asyncio.sleep(interval)
+        net = psutil.net_io_counters()
+        now = time.monotonic()
+        elapsed = max(now - prev_time, 1e-6)
+        if event_bus.has_subscribers(Topic.STATS):
+            await event_bus.publish(Topic.STATS, {
+                "type": "stats",
+                "data": {
+                    "cpu": psutil.cpu_percent(interval=None),
+                    "ram": psutil.virtual_memory().percent,
+                    # Bytes/sec over the real elapsed time
+                    "net_sent_speed": int((net.bytes_sent - prev_sent) / elapsed),
+                    "net_recv_speed": int((net.bytes_recv - prev_recv) / elapsed)
+                }
+            })
+        prev_sent, prev_recv, prev_time = net.bytes_sent, net.bytes_recv, now
+
+async def log_tailer(paths, interval: float = 2.0, lines_per_frame: int = 50):
+    """Publishes new (deduplicated) lines of the given log files, like tail -f."""
+    # Starts at the end of each file, reads at most 256 KB per tick and keeps
+    # offsets in memory (no log_offsets.json written into the working directory)
+    optimizer = TokenOptimizer(SmartLogReader(state_file=None, start_at_end=True, max_bytes=256 * 1024))
+    while True:
+        for path in paths:
+            text = await asyncio.to_thread(optimizer.process_log_file, path)
+            lines = text.splitlines()
+            for start in range(0, len(lines), lines_per_frame):
+                await event_bus.publish(Topic.LOGS, {
+                    "type": "log",
+                    "user": f"Log:{os.path.basename(path)}",
+                    "msg": "\n".join(lines[start:start + lines_per_frame]),
+                    "isAi": False
+                })
+        await asyncio.sleep(interval)
+
 @app.get("/")
 def read_root():
     return {"status": "active", "os": runtime_os, "mode": "eco-silent"}
 
+@app.get("/events")
+def event_stats():
+    return event_bus.stats()
+
+def runtime_samples():
+    samples = [
+        ("jarvis_work_queue_depth", "gauge", "Jobs waiting in the shared work queue.", {}, work_queue.qsize()),
+        ("jarvis_fleet_hosts", "gauge", "Fleet agents currently connected.", {}, len(fleet.hosts)),
+    ]
+    for topic, counters in event_bus.stats().items():
+        for outcome in ("published", "delivered", "dropped", "spilled"):
+            samples.append(("jarvis_bus_events_total", "counter", "Event bus throughput per topic.",
+                            {"topic": topic, "outcome": outcome}, counters[outcome]))
+    return samples
+
+metrics.registry.add_collector(runtime_samples)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/profile", response_class=PlainTextResponse)
+def profile_endpoint():
+    if not profiler:
+        return PlainTextResponse("Profiler disabled. Restart with JARVIS_PROFILE=1.\n", status_code=404)
+    return PlainTextResponse(profiler.folded())
+
+@app.get("/fleet")
+def fleet_status():
+    return {"hosts": fleet.list_hosts(), "stats": fleet.aggregate_stats()}
+
+@fleet_app.websocket("/fleet/ws")
+async def fleet_endpoint(websocket: WebSocket):
+    await websocket.accept()
+    await fleet.serve(websocket)
+
+async def stream_fleet_run(send, action: str, param, hosts):
+    """Streams per-host results of a fleet run to the HUD as they arrive."""
+    ok = failed = 0
+    async for result in fleet.run(action, param, hosts):
+        event_bus.publish_nowait(Topic.JOBS, {
+            "type": "job", "key": f"fleet:{result['host']}", "action": action,
+            "state": result["status"], "elapsed": result["elapsed"]
+        })
+        if result["status"] == "done":
+            ok += 1
+            icon = "✅"
+        else:
+            failed += 1
+            icon = "❌"
+        await send({
+            "type": "log",
+            "user": f"Fleet:{result['host']}",
+            "msg": f"{icon} [{result['host']}] {action} ({result['elapsed']:.1f}s)\n{result['msg']}",
+            "isAi": True
+        })
+    await send({
+        "type": "log",
+        "user": "System",
+        "msg": f"🖧 Fleet run '{action}' complete: {ok} ok, {failed} failed.",
+        "isAi": True
+    })
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
@@ -72,26 +232,40 @@ async def websocket_endpoint(websocket: WebSocket):
     
     # Session State
     pending_action = None
+    fleet_runs = set()
+
+    # Replies (this task) and bus events (forwarder task) share the socket
+    send_lock = asyncio.Lock()
+
+    async def send(payload):
+        with metrics.WS_SEND_SECONDS.time():
+            async with send_lock:
+                await websocket.send_json(payload)
+        metrics.WS_FRAMES_SENT.inc()
+
+    def start_fleet_run(action, param, hosts):
+        run = asyncio.create_task(stream_fleet_run(send, action, param, hosts))
+        fleet_runs.add(run)
+        run.add_done_callback(fleet_runs.discard)
+        return f"🖧 Fanning '{action}' out to {len(hosts)} hosts..."
+
+    async def forward_events():
+        try:
+            async for _, event in subscription:
+                await send(event)
+        except Exception as e:
+            logger.info(f"Event forwarding stopped: {e}")
+
+    subscription = event_bus.subscribe({Topic.STATS, Topic.ALERTS, Topic.LOGS})
+    forwarder = asyncio.create_task(forward_events())
     
     try:
         while True:
             # 1. Receive & Process User Command
-            # We need a way to listen for messages AND push stats. 
-            # Solution: asyncio.gather or simple timeout loop? 
-            # Better: Use a separate task for receiving or just rely on the frontend to push, 
-            # but we need to push stats periodically. 
-            
-            # Pattern: Infinite loop with timeout to allow sending stats if no msg received? 
-            # Or separate Producer/Consumer tasks.
-            # Simplified for PoC: Receive with timeout.
-            
-            # Init stats refs
-            net_init = psutil.net_io_counters()
-            prev_net_sent = net_init.bytes_sent
-            prev_net_recv = net_init.bytes_recv
+            # Stats/alerts/logs are pushed by the forwarder task; this loop only handles commands.
             
             try:
-                # Wait for command with 1.0s timeout (Acts as 1Hz heartbeat)
+                # Wait for command with 1.0s timeout (Acts as 1Hz heartbeat; stats arrive via the bus)
                 data = await asyncio.wait_for(websocket.receive_text(), timeout=1.0)
                 cmd = json.loads(data)
                 logger.info(f"Received CMD: {cmd}")
@@ -103,20 +277,52 @@ async def websocket_endpoint(websocket: WebSocket):
                     mode = cmd.get("mode")
                     reply = f"System Mode Switched to: {mode.upper()}"
                     # TODO: Call agent.set_mode(mode)
+
+                elif msg_type == "fleet":
+                    # Explicit operator command from the HUD: fan an allow-listed action out to remote hosts
+                    action = cmd.get("action")
+                    param = cmd.get("param")
+                    hosts = cmd.get("hosts") or list(fleet.hosts)
+                    param_error = agent.validator.validate_params(action, param)
+                    if action not in FLEET_ALLOW_LIST:
+                        reply = f"⛔ '{action}' is not allowed in Fleet Mode."
+                    elif param_error:
+                        reply = f"⛔ {param_error}"
+                    elif not hosts:
+                        reply = "🖧 No fleet hosts are connected."
+                    elif agent.validator.validate_action(action) == ActionStatus.APPROVAL_NEEDED:
+                        # Same approval flow as local actions: nothing is sent to the hosts before 'yes'
+                        agent.speculator.discard()
+                        pending_action = {"action": action, "param": param or {}, "fleet_hosts": hosts}
+                        impact = agent.validator.get_impact_description(action)
+                        reply = (f"⚠️ APPROVAL REQUIRED: Fleet run of '{action}' on {len(hosts)} hosts. "
+                                 f"{impact} \nType 'yes' to proceed.")
+                    else:
+                        reply = start_fleet_run(action, param, hosts)
                 
                 elif msg_type == "chat":
                     user_msg = cmd.get("msg")
                     
                     # 1. Check if user is confirming a pending action
-                    if pending_action and user_msg.lower() in ["yes", "confirm", "approve", "ok"]:
+                    if pending_action and pending_action.get("fleet_hosts") and user_msg.lower() in ["yes", "confirm", "approve", "ok"]:
+                        logger.info(f"User approved fleet run: {pending_action['action']}")
+                        reply = start_fleet_run(pending_action["action"], pending_action["param"],
+                                                pending_action["fleet_hosts"])
+                        pending_action = None
+
+                    elif pending_action and user_msg.lower() in ["yes", "confirm", "approve", "ok"]:
                         # Execute the pending action
                         logger.info(f"User approved action: {pending_action['action']}")
                         # Pass bypass_validator=True to prevent infinite approval loop
-                        result = await agent.execute_action(pending_action, executor, bypass_validator=True)
+                        approved = pending_action
+                        result = await work_queue.run(
+                            id(websocket),
+                            lambda: agent.execute_action(approved, executor, bypass_validator=True)
+                        )
                         
                         action_name = pending_action['action']
                         if action_name == "simulate_attack":
-                             await websocket.send_json({
+                             await event_bus.publish(Topic.ALERTS, {
                                 "type": "threat_alert",
                                 "level": "critical",
                                 "msg": "SYN Flood Attack Detected from 192.168.0.44"
@@ -131,16 +337,18 @@ async def websocket_endpoint(websocket: WebSocket):
                         
                     elif pending_action and user_msg.lower() in ["no", "cancel", "deny"]:
                         reply = "Action cancelled by user."
+                        agent.speculator.discard()
                         pending_action = None
                         
                     else:
-                        # 2. Normal Agent Processing
-                        # Parse Intent
-                        intent = agent.process_input("", user_msg)
-                        
-                        # Try to Execute
-                        # We need to modify execute_action to return the status so we can handle it here
-                        result = await agent.execute_action(intent, executor)
+                        # 2. Normal Agent Processing (on the shared work queue)
+                        async def handle_chat():
+                            # Parse Intent (blocking LLM call, keep it off the event loop)
+                            intent = await asyncio.to_thread(agent.process_input, "", user_msg)
+                            # Try to Execute
+                            return intent, await agent.execute_action(intent, executor)
+
+                        intent, result = await work_queue.run(id(websocket), handle_chat)
                         
                         if result["status"] == "approval_required":
                              pending_action = intent # Store specifically the intent wrapper
@@ -151,7 +359,7 @@ async def websocket_endpoint(websocket: WebSocket):
                              reply = result["msg"]
                              # Special handling for resolve
                              if intent.get("action") == "resolve_threat":
-                                 await websocket.send_json({"type": "threat_alert", "level": "safe", "msg": "Threat Neutralized."})
+                                 await event_bus.publish(Topic.ALERTS, {"type": "threat_alert", "level": "safe", "msg": "Threat Neutralized."})
                         else:
                              reply = intent.get("reply", "I heard you.")
                 
@@ -159,53 +367,87 @@ async def websocket_endpoint(websocket: WebSocket):
                     reply = "Unknown Command Protocol"
 
                 # Send Confirmation
-                await websocket.send_json({
+                await send({
                     "type": "log", 
                     "user": "System", 
                     "msg": reply, 
                     "isAi": True
                 })
                 
+            except asyncio.QueueFull:
+                # Backpressure: the shared work queue is saturated
+                await send({
+                    "type": "log",
+                    "user": "System",
+                    "msg": "🚦 JARVIS is busy right now. Please try again in a moment.",
+                    "isAi": True
+                })
             except asyncio.TimeoutError:
                 pass # No command, proceed to regular updates
-            
-            # 2. Push System Stats
-            cpu = psutil.cpu_percent(interval=None)
-            ram = psutil.virtual_memory().percent
-            
-            # Network Speed Calculation (Delta)
-            net = psutil.net_io_counters()
-            bytes_sent = net.bytes_sent
-            bytes_recv = net.bytes_recv
-            
-            # Calculate speed (Bytes/sec) - assuming ~1s interval
-            # In a production app, use precise time deltas
-            speed_sent = bytes_sent - prev_net_sent
-            speed_recv = bytes_recv - prev_net_recv
-            
-            prev_net_sent = bytes_sent
-            prev_net_recv = bytes_recv
-            
-            payload = {
-                "type": "stats",
-                "data": {
-                    "cpu": cpu,
-                    "ram": ram,
-                    "net_sent_speed": speed_sent,
-                    "net_recv_speed": speed_recv
-                }
-            }
-            
-            await websocket.send_json(payload)
-            # await asyncio.sleep(1) # Interval handled by wait_for timeout implicitly? 
-            # No, wait_for returns immediately if no msg. We need explicit sleep to prevent busy loop if no msg.
-            # Actually, if we use timeout=1.0, it acts as the interval.
+
+            # Speculative Stage: report the real impact once the pre-check finishes
+            if pending_action:
+                impact = agent.speculator.poll_impact()
+                if impact:
+                    await send({
+                        "type": "log",
+                        "user": "System",
+                        "msg": f"{impact}\nType 'yes' to proceed.",
+                        "isAi": True
+                    })
             
     except Exception as e:
         logger.error(f"WebSocket Error: {e}")
     finally:
+        agent.speculator.discard()
+        subscription.close()
+        forwarder.cancel()
+        for run in fleet_runs:
+            run.cancel()
         logger.info("Client disconnected")
 
 if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=8888)
+    import argparse
+    parser = argparse.ArgumentParser(description="Project JARVIS Core")
+    parser.add_argument("--fleet-agent", metavar="CORE_URL",
+                        help="Run as a fleet agent of the given core (e.g. ws://core:8888/fleet/ws) instead of serving the HUD")
+    parser.add_argument("--host", help="Name to register with the fleet core (default: hostname)")
+    parser.add_argument("--simulate", action="store_true",
+                        help="Use the simulated executor: no real apt, iptables or file changes")
+    parser.add_argument("--latency", type=float, default=0.5, help="Latency of simulated actions in seconds")
+    parser.add_argument("--port", type=int, default=8888, help="HUD port (always bound to 127.0.0.1)")
+    parser.add_argument("--fleet-listen", default="127.0.0.1",
+                        help="Address of the fleet agent listener (use 0.0.0.0 to accept agents from other machines)")
+    parser.add_argument("--fleet-port", type=int, default=8889, help="Port of the fleet agent listener")
+    args = parser.parse_args()
+
+    if args.fleet_agent:
+        from core.fleet import FleetAgent
+        from core.executor import SimulatedExecutor
+        executor = SimulatedExecutor(latency=args.latency) if args.simulate else ExecutorFactory.get_executor(runtime_os)
+        fleet_agent = FleetAgent(args.fleet_agent, os.getenv("JARVIS_FLEET_TOKEN", ""), executor, host=args.host)
+        try:
+            asyncio.run(fleet_agent.run_forever())
+        except KeyboardInterrupt:
+            pass
+    elif not fleet.token:
+        import uvicorn
+        uvicorn.run(app, host="127.0.0.1", port=args.port)
+    else:
+        import uvicorn
+
+        async def serve_all():
+            hud = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port))
+            agents = uvicorn.Server(uvicorn.Config(fleet_app, host=args.fleet_listen, port=args.fleet_port))
+            logger.info(f"🖧 Fleet listener on {args.fleet_listen}:{args.fleet_port} (HUD stays on 127.0.0.1:{args.port}).")
+            agents_task = asyncio.create_task(agents.serve())
+            try:
+                await hud.serve()
+            finally:
+                agents.should_exit = True
+                await agents_task
+
+        try:
+            asyncio.run(serve_all())
+        except KeyboardInterrupt:
+            pass
@@ -1,27 +1,99 @@
 import discord
 import logging
 import asyncio
-from typing import Optional
+import os
+from typing import Any, Dict, List, Optional, Set
 from discord.ext import commands
-# In real scenario: from core.agent import HybridAgent
+
+from core.agent import HybridAgent
+from core.events import EventBus, Topic
+from core.executor import CommandExecutor
+from core.workqueue import WorkQueue, RateLimiter
 
 logger = logging.getLogger("jarvis.skill.discord_bot")
 
+APPROVE_WORDS = ["yes", "confirm", "approve", "ok"]
+DENY_WORDS = ["no", "cancel", "deny"]
+
+# Discord rejects messages longer than 2000 characters
+MESSAGE_LIMIT = 1900
+
+
+def parse_admin_ids(raw: str) -> Set[int]:
+    """DISCORD_ADMIN_IDS: comma-separated Discord user IDs allowed to request and approve actions."""
+    ids = set()
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            ids.add(int(part))
+        except ValueError:
+            logger.warning(f"Ignoring invalid Discord user ID in DISCORD_ADMIN_IDS: {part!r}")
+    return ids
+
+
+def chunk_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """Splits text into Discord-sized chunks, preferring line boundaries."""
+    chunks = []
+    current = ""
+    for line in text.splitlines(keepends=True):
+        while len(line) > limit:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:limit])
+            line = line[limit:]
+        if len(current) + len(line) > limit:
+            chunks.append(current)
+            current = ""
+        current += line
+    if current.strip():
+        chunks.append(current)
+    return chunks
+
+
 class JarvisDiscordBot:
-    def __init__(self, token: str, agent: 'HybridAgent'):
+    """
+    Discord remote control.
+    Requests are handed to the shared WorkQueue and run through the same
+    Security Shield and executor as the HUD, so the gateway event loop is
+    never blocked by the LLM or by long-running actions.
+
+    Unlike the HUD (localhost only), anyone who can DM or mention the bot can
+    reach it: approval-gated actions can only be requested and approved by
+    operators listed in DISCORD_ADMIN_IDS. Everyone else gets chat and the
+    read-only actions of the allow-list.
+    """
+
+    def __init__(self, token: str, work_queue: WorkQueue, executor: CommandExecutor,
+                 rate_limiter: Optional[RateLimiter] = None, bus: Optional[EventBus] = None):
         self.token = token
-        self.agent = agent
+        self.work_queue = work_queue
+        self.executor = executor
+        self.rate_limiter = rate_limiter or RateLimiter(rate=5, per=60.0)
+        self.bus = bus
+        self.admin_ids = parse_admin_ids(os.getenv("DISCORD_ADMIN_IDS", ""))
+        if not self.admin_ids:
+            logger.warning("DISCORD_ADMIN_IDS is not set: nobody can run approval-gated actions from Discord.")
+        # Security alerts are mirrored here when set
+        self.alert_channel_id = int(os.getenv("DISCORD_ALERT_CHANNEL_ID", "0")) or None
+        self._alert_task = None
+        # Per-channel session state (agent + pending approval), like one HUD connection
+        self.sessions: Dict[int, Dict[str, Any]] = {}
         # Intents needed for reading message content
         intents = discord.Intents.default()
         intents.message_content = True
         self.client = commands.Bot(command_prefix="!", intents=intents)
-        
+
         self.setup_events()
 
     def setup_events(self):
         @self.client.event
         async def on_ready():
             logger.info(f"Discord Bot connected as {self.client.user}")
+            if self.bus and self.alert_channel_id and self._alert_task is None:
+                self._alert_task = asyncio.create_task(self._forward_alerts())
 
         @self.client.event
         async def on_message(message):
@@ -32,21 +104,121 @@ class JarvisDiscordBot:
             if not (isinstance(message.channel, discord.DMChannel) or self.client.user in message.mentions):
                 return
 
+            if not self.rate_limiter.allow(message.author.id):
+                logger.warning(f"Rate limit hit by Discord user {message.author.id}")
+                await message.add_reaction("⏳")
+                return
+
             user_query = message.content.replace(f"<@{self.client.user.id}>", "").strip()
             logger.info(f"Discord command received: {user_query}")
-            
-            # Use Hybrid Agent to process intent
-            # Simplified for PoC - in real app would get context from system
-            response = self.agent.process_input("Discord Remote Command", user_query)
-            
-            reply_text = response.get("reply", "I'm sorry, I couldn't process that.")
-            action = response.get("action")
-            
-            if action:
-                # Mock execution result
-                reply_text += f"\n✅ Action `{action}` queued."
-            
-            await message.channel.send(reply_text)
+
+            channel = message.channel
+            author_id = message.author.id
+            # A burst from one user collapses into its newest message. Replies
+            # collapse separately: an approval never replaces the request it answers
+            is_reply = user_query.lower() in APPROVE_WORDS + DENY_WORDS
+            try:
+                future = self.work_queue.submit(
+                    channel.id,
+                    lambda: self.handle_command(channel, author_id, user_query),
+                    coalesce_key=(author_id, "reply") if is_reply else author_id
+                )
+            except asyncio.QueueFull:
+                await channel.send("🚦 JARVIS is busy right now. Please try again in a moment.")
+                return
+            future.add_done_callback(lambda f: self._on_done(f, message))
+
+    def _session(self, channel_id: int) -> Dict[str, Any]:
+        if channel_id not in self.sessions:
+            self.sessions[channel_id] = {"agent": HybridAgent(), "pending": None}
+        return self.sessions[channel_id]
+
+    def is_admin(self, user_id: int) -> bool:
+        return user_id in self.admin_ids
+
+    async def handle_command(self, channel, author_id: int, user_query: str):
+        """Runs on a WorkQueue worker. Mirrors the HUD approval flow per channel."""
+        session = self._session(channel.id)
+        agent = session["agent"]
+        pending = session["pending"]
+        word = user_query.lower()
+
+        if pending and word in APPROVE_WORDS + DENY_WORDS and not self.is_admin(author_id):
+            logger.warning(f"Discord user {author_id} (not an operator) tried to answer a pending approval.")
+            reply = "⛔ Only JARVIS operators can approve or cancel this action."
+
+        elif pending and word in APPROVE_WORDS:
+            logger.info(f"Discord user approved action: {pending['action']}")
+            session["pending"] = None
+            await channel.send(f"⏳ Running `{pending['action']}`...")
+            result = await agent.execute_action(pending, self.executor, bypass_validator=True)
+            reply = f"Action '{pending['action']}' Result:\n{result.get('msg', 'No Output')}"
+
+        elif pending and word in DENY_WORDS:
+            agent.speculator.discard()
+            session["pending"] = None
+            reply = "Action cancelled by user."
+
+        else:
+            # The LLM call is blocking: keep it off the event loop
+            intent = await asyncio.to_thread(agent.process_input, "Discord Remote Command", user_query)
+            action = intent.get("action")
+            if action in agent.validator.REQUIRE_APPROVAL and not self.is_admin(author_id):
+                # Checked before execute_action: not even the speculative pre-check may run
+                logger.warning(f"Discord user {author_id} (not an operator) requested '{action}'.")
+                await self.send_chunked(channel, f"⛔ '{action}' can only be requested by JARVIS operators.")
+                return
+
+            result = await agent.execute_action(intent, self.executor)
+
+            if result["status"] == "approval_required":
+                session["pending"] = intent
+                reply = f"⚠️ APPROVAL REQUIRED: {result['msg']} \nReply 'yes' to proceed."
+                if result.get("preparing"):
+                    asyncio.create_task(self._stream_impact(channel, session, intent))
+            elif result["status"] == "blocked":
+                reply = f"⛔ {result['msg']}"
+            else:
+                reply = intent.get("reply", "I'm sorry, I couldn't process that.")
+                if result["msg"]:
+                    reply += f"\n{result['msg']}"
+
+        await self.send_chunked(channel, reply)
+
+    async def _stream_impact(self, channel, session: Dict[str, Any], intent: Dict[str, Any]):
+        """Forwards speculative pre-check results while the approval is pending."""
+        agent = session["agent"]
+        while session["pending"] is intent and agent.speculator.active:
+            await asyncio.sleep(1.0)
+            impact = agent.speculator.poll_impact()
+            if impact and session["pending"] is intent:
+                await self.send_chunked(channel, impact)
+
+    async def _forward_alerts(self):
+        channel = self.client.get_channel(self.alert_channel_id)
+        if channel is None:
+            logger.warning(f"Alert channel {self.alert_channel_id} not found. Alert mirroring disabled.")
+            return
+        subscription = self.bus.subscribe({Topic.ALERTS})
+        try:
+            async for _, alert in subscription:
+                icon = "🚨" if alert.get("level") == "critical" else "✅"
+                await self.send_chunked(channel, f"{icon} {alert.get('msg')}")
+        finally:
+            subscription.close()
+
+    async def send_chunked(self, channel, text: str):
+        # Chunks go out one by one as they are produced; discord.py paces them against rate limits
+        for chunk in chunk_message(text):
+            await channel.send(chunk)
+
+    @staticmethod
+    def _on_done(future: asyncio.Future, message):
+        if future.cancelled():
+            # Superseded by the same user's newer message while still queued
+            asyncio.create_task(message.add_reaction("⏭️"))
+        elif future.exception() is not None:
+            logger.error(f"Discord command failed: {future.exception()}")
 
     async def start(self):
         if not self.token:
@@ -56,6 +228,8 @@ class JarvisDiscordBot:
             await self.client.start(self.token)
         except Exception as e:
             logger.error(f"Failed to start Discord Bot: {e}")
-            
+
     async def stop(self):
+        if self._alert_task:
+            self._alert_task.cancel()
         await self.client.close()
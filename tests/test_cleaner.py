@@ -0,0 +1,174 @@
+import os
+
+import pytest
+
+import core.cleaner as cleaner_module
+from core.cleaner import QuickCleaner
+
+# ctime cannot be backdated, so "old" files are simulated with a cutoff in the future
+EVERYTHING_OLD = -3600
+NOTHING_OLD = 3600
+
+
+def make_tree(root):
+    os.makedirs(root / "a" / "b")
+    (root / "top.txt").write_bytes(b"x" * 10)
+    (root / "a" / "one.txt").write_bytes(b"x" * 20)
+    (root / "a" / "b" / "two.txt").write_bytes(b"x" * 30)
+
+
+def clean(root, min_age, dry_run=False, **target):
+    cleaner = QuickCleaner({"tmp": {"roots": [str(root)], "min_age": min_age, **target}}, max_workers=2)
+    reports = list(cleaner.scan() if dry_run else cleaner.clean())
+    return reports[0]
+
+
+def test_removes_old_files_and_empty_dirs(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+
+    report = clean(root, EVERYTHING_OLD)
+
+    assert report["files"] == 3
+    assert report["bytes"] == 60
+    assert report["errors"] == 0
+    assert os.listdir(root) == []
+
+
+def test_keeps_recent_files(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+
+    report = clean(root, NOTHING_OLD)
+
+    assert report["files"] == 0
+    assert (root / "a" / "b" / "two.txt").exists()
+
+
+def test_recent_directory_is_emptied_but_kept(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+    os.utime(root / "a", (0, 0))  # Old directory: removable once empty
+
+    # Cutoff between epoch and now: dirs are judged by mtime, files by max(mtime, ctime)
+    report = clean(root, 60)
+
+    assert report["files"] == 0
+    assert (root / "a").is_dir()
+
+
+def test_dry_run_does_not_delete(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+
+    report = clean(root, EVERYTHING_OLD, dry_run=True)
+
+    assert report["files"] == 3
+    assert report["dry_run"]
+    assert (root / "a" / "b" / "two.txt").exists()
+
+
+def test_protect_and_suffixes(tmp_path):
+    root = tmp_path / "root"
+    make_tree(root)
+    (root / "keep.deb").write_bytes(b"x")
+    (root / "drop.deb").write_bytes(b"x")
+
+    clean(root, EVERYTHING_OLD, protect=["keep*", "a"], suffixes=[".deb"])
+
+    assert sorted(os.listdir(root)) == ["a", "keep.deb", "top.txt"]
+    assert (root / "a" / "one.txt").exists()
+
+
+def test_symlinked_directory_is_not_followed(tmp_path):
+    root = tmp_path / "root"
+    outside = tmp_path / "outside"
+    os.makedirs(root)
+    os.makedirs(outside)
+    (outside / "victim.txt").write_text("keep me")
+    os.symlink(outside, root / "link")
+    os.symlink(outside / "victim.txt", root / "file_link")
+
+    clean(root, EVERYTHING_OLD)
+
+    # The links themselves are removed, never what they point to
+    assert (outside / "victim.txt").read_text() == "keep me"
+    assert os.listdir(root) == []
+
+
+def test_directory_swapped_for_symlink_after_listing(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    outside = tmp_path / "outside"
+    os.makedirs(root / "victim_dir")
+    os.makedirs(outside)
+    (outside / "victim.txt").write_text("keep me")
+
+    real_scandir = os.scandir
+
+    class Listing(list):
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    def racing_scandir(target):
+        entries = Listing(real_scandir(target))
+        if os.path.exists(root / "victim_dir") and not os.path.islink(root / "victim_dir"):
+            # The attacker wins the race: the listed directory is now a symlink
+            os.rmdir(root / "victim_dir")
+            os.symlink(outside, root / "victim_dir")
+        return entries
+
+    monkeypatch.setattr(cleaner_module.os, "scandir", racing_scandir)
+    report = clean(root, EVERYTHING_OLD)
+
+    assert (outside / "victim.txt").read_text() == "keep me"
+    assert report["errors"] == 1
+
+
+def test_symlink_in_root_path_is_refused(tmp_path):
+    real = tmp_path / "real"
+    make_tree(real)
+    os.symlink(real, tmp_path / "alias")
+
+    report = clean(tmp_path / "alias", EVERYTHING_OLD)
+
+    assert report["files"] == 0
+    assert (real / "a" / "b" / "two.txt").exists()
+
+
+def test_does_not_cross_devices(tmp_path, monkeypatch):
+    root = tmp_path / "root"
+    make_tree(root)
+    mount_ino = os.stat(root / "a").st_ino
+
+    real_fstat = os.fstat
+
+    def fake_fstat(fd):
+        st = real_fstat(fd)
+        if st.st_ino == mount_ino:
+            # Pretend "a" is another filesystem mounted inside the root
+            fields = list(st)
+            fields[2] = st.st_dev + 1
+            return os.stat_result(fields)
+        return st
+
+    monkeypatch.setattr(cleaner_module.os, "fstat", fake_fstat)
+    report = clean(root, EVERYTHING_OLD)
+
+    assert report["files"] == 1
+    assert (root / "a" / "b" / "two.txt").exists()
+    assert not (root / "top.txt").exists()
+
+
+@pytest.mark.skipif(not hasattr(os, "mkfifo"), reason="needs FIFOs")
+def test_skips_special_files(tmp_path):
+    root = tmp_path / "root"
+    os.makedirs(root)
+    os.mkfifo(root / "pipe")
+
+    report = clean(root, EVERYTHING_OLD)
+
+    assert report["files"] == 0
+    assert (root / "pipe").exists()
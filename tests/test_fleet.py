@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+from core.executor import SimulatedExecutor
+from core.fleet import FleetAgent, FleetCoordinator
+
+
+class FakeCoreSocket:
+    """Agent connection as seen by the core (Starlette WebSocket API)."""
+
+    def __init__(self, messages):
+        self.messages = list(messages)
+        self.sent = []
+        self.close_code = None
+
+    async def receive_json(self):
+        if not self.messages:
+            raise ConnectionError("disconnected")
+        return self.messages.pop(0)
+
+    async def send_json(self, payload):
+        self.sent.append(payload)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+
+class FakeAgentSocket:
+    """Core connection as seen by the agent (websockets client API)."""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, raw):
+        self.sent.append(json.loads(raw))
+
+
+@pytest.mark.parametrize("hello", [
+    ["not", "a", "dict"],
+    {"type": "register", "host": "h", "token": "tökén"},
+    {"type": "register", "host": "h", "token": 12345},
+    {"type": "register", "host": "h"},
+])
+def test_bad_registration_is_closed_with_1008(hello):
+    coordinator = FleetCoordinator("secret")
+    ws = FakeCoreSocket([hello])
+
+    asyncio.run(coordinator.serve(ws))
+
+    assert ws.close_code == 1008
+    assert coordinator.hosts == {}
+
+
+def test_registration_without_core_token_is_refused():
+    coordinator = FleetCoordinator(None)
+    ws = FakeCoreSocket([{"type": "register", "host": "h", "token": ""}])
+
+    asyncio.run(coordinator.serve(ws))
+
+    assert ws.close_code == 1008
+
+
+def test_run_rejects_unsafe_gpg_key_before_dispatch():
+    coordinator = FleetCoordinator("secret")
+
+    async def run():
+        return [r async for r in coordinator.run("fix_system_issue", {"target": "gpg", "key_id": "0; id"}, ["h"])]
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+def test_run_rejects_actions_outside_allow_list():
+    coordinator = FleetCoordinator("secret")
+
+    async def run():
+        return [r async for r in coordinator.run("delete_file", None, ["h"])]
+
+    with pytest.raises(PermissionError):
+        asyncio.run(run())
+
+
+def test_agent_refuses_unsafe_gpg_key():
+    agent = FleetAgent("ws://core", "secret", SimulatedExecutor(latency=0), host="h")
+    ws = FakeAgentSocket()
+    job = {"type": "run", "job_id": "j1", "action": "fix_system_issue",
+           "param": {"target": "gpg", "key_id": "$(reboot)"}}
+
+    asyncio.run(agent._run_job(ws, job))
+
+    assert ws.sent[0]["job_id"] == "j1"
+    assert ws.sent[0]["status"] == "blocked"
+
+
+def test_agent_reports_failed_action_as_error():
+    class BrokenExecutor(SimulatedExecutor):
+        async def check_firewall(self):
+            raise RuntimeError("iptables exploded")
+
+    agent = FleetAgent("ws://core", "secret", BrokenExecutor(latency=0), host="h")
+    ws = FakeAgentSocket()
+
+    asyncio.run(agent._run_job(ws, {"type": "run", "job_id": "j2", "action": "security_scan_ports"}))
+
+    assert ws.sent == [{"type": "result", "job_id": "j2", "status": "error", "msg": "⚠️ ERROR: iptables exploded"}]
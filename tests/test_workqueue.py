@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+import pytest
+
+from core.workqueue import RateLimiter, WorkQueue
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def started(workers: int = 4, maxsize: int = 32) -> WorkQueue:
+    queue = WorkQueue(workers=workers, maxsize=maxsize)
+    await queue.start()
+    return queue
+
+
+def test_jobs_of_one_key_run_in_order_one_at_a_time():
+    async def scenario():
+        queue = await started()
+        order, active = [], []
+
+        def job(i):
+            async def fn():
+                active.append(i)
+                assert len(active) == 1
+                await asyncio.sleep(0.01)
+                order.append(i)
+                active.remove(i)
+                return i
+            return fn
+
+        results = await asyncio.gather(*(queue.submit("chan", job(i)) for i in range(5)))
+        await queue.stop()
+        return order, results
+
+    order, results = run(scenario())
+    assert order == [0, 1, 2, 3, 4]
+    assert results == [0, 1, 2, 3, 4]
+
+
+def test_busy_key_does_not_starve_other_keys():
+    async def scenario():
+        queue = await started(workers=4)
+        gate = asyncio.Event()
+
+        async def slow():
+            await gate.wait()
+
+        for _ in range(5):
+            queue.submit("channel-1", slow)
+        await asyncio.sleep(0)
+
+        async def fast():
+            return "ok"
+
+        started_at = time.monotonic()
+        result = await asyncio.wait_for(queue.run("hud-socket", fast), timeout=1.0)
+        elapsed = time.monotonic() - started_at
+        gate.set()
+        await queue.stop()
+        return result, elapsed
+
+    result, elapsed = run(scenario())
+    assert result == "ok"
+    assert elapsed < 0.5
+
+
+def test_coalescing_replaces_only_the_same_coalesce_key():
+    async def scenario():
+        queue = await started(workers=1)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        def reply(text):
+            async def fn():
+                return text
+            return fn
+
+        queue.submit("chan", blocker)
+        await asyncio.sleep(0)
+        a_old = queue.submit("chan", reply("A update"), coalesce_key="A")
+        b = queue.submit("chan", reply("B hi"), coalesce_key="B")
+        a_new = queue.submit("chan", reply("A newer"), coalesce_key="A")
+        plain = queue.submit("chan", reply("A yes"))
+        depth = queue.qsize()
+        gate.set()
+        results = await asyncio.gather(b, a_new, plain)
+        await queue.stop()
+        return a_old, depth, results
+
+    a_old, depth, results = run(scenario())
+    assert a_old.cancelled()
+    assert depth == 3
+    assert results == ["B hi", "A newer", "A yes"]
+
+
+def test_full_queue_raises_queue_full():
+    async def scenario():
+        queue = await started(workers=1, maxsize=2)
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        queue.submit("a", blocker)
+        await asyncio.sleep(0)  # Running jobs do not count against maxsize
+        queue.submit("a", blocker)
+        queue.submit("b", blocker)
+        with pytest.raises(asyncio.QueueFull):
+            queue.submit("c", blocker)
+        gate.set()
+        await queue.stop()
+
+    run(scenario())
+
+
+def test_failures_settle_the_future_and_keep_the_worker():
+    async def scenario():
+        queue = await started(workers=1)
+
+        async def boom():
+            raise RuntimeError("boom")
+
+        async def cancelled_inside():
+            raise asyncio.CancelledError()
+
+        async def fine():
+            return "still serving"
+
+        failed = queue.submit("k", boom)
+        cancelled = queue.submit("k", cancelled_inside)
+        ok = queue.submit("k", fine)
+        with pytest.raises(RuntimeError):
+            await failed
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        result = await asyncio.wait_for(ok, timeout=1.0)
+        await queue.stop()
+        return result
+
+    assert run(scenario()) == "still serving"
+
+
+def test_stop_cancels_running_jobs():
+    async def scenario():
+        queue = await started(workers=1)
+
+        async def forever():
+            await asyncio.sleep(3600)
+
+        future = queue.submit("k", forever)
+        await asyncio.sleep(0.01)
+        await queue.stop()
+        return future
+
+    assert run(scenario()).cancelled()
+
+
+def test_rate_limiter_allows_burst_then_refills(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("core.workqueue.time.monotonic", lambda: now[0])
+    limiter = RateLimiter(rate=2, per=10.0)
+
+    assert [limiter.allow("u") for _ in range(3)] == [True, True, False]
+    assert limiter.allow("other")
+    now[0] += 5.0
+    assert limiter.allow("u")
+    assert not limiter.allow("u")